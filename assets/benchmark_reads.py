@@ -0,0 +1,92 @@
+# Run from the repository root: python assets/benchmark_reads.py [--users 20000] [--iterations 2000]
+# Fills a temporary season with synthetic users and contracts, then times the hot lookups on default connections and on the reader profile.
+import statistics
+import tempfile
+import argparse
+import asyncio
+import random
+import time
+import sys
+import os
+
+sys.path.insert(0, os.getcwd())
+
+import utils  # noqa: E402, F401
+from contracts import SeasonDB, UserStatus, ContractType, ContractKind, ContractStatus  # noqa: E402
+from contracts.pool import ConnectionPool, READER_PRAGMAS  # noqa: E402
+from contracts.query import select_query, count_query  # noqa: E402
+
+CONTRACT_TYPES = [ContractType.BASE_CONTRACT, ContractType.CHALLENGE_CONTRACT, ContractType.VETERAN_SPECIAL, ContractType.MOVIE_SPECIAL]
+
+
+async def fill(season_db: SeasonDB, users: int):
+	usernames = [f"user{i}" for i in range(users)]
+	async with season_db.write_session() as session:
+		for i, username in enumerate(usernames):
+			session.create_user(
+				username, random.choice(list(UserStatus)), rep=f"REP{i % 40}", contractor=usernames[(i + 1) % users], preferences="x" * 200
+			)
+			for contract_type in CONTRACT_TYPES:
+				session.create_contract(f"Some Title {i}", contract_type, ContractKind.NORMAL, random.choice(list(ContractStatus)), username)
+
+
+def lookups(users: int) -> list[tuple[str, str, list]]:
+	username = f"user{random.randrange(users)}"
+	rep = f"REP{random.randrange(40)}"
+	return [
+		("/get contracts", *select_query("contracts", {"contractee": username, "kind": ContractKind.NORMAL})),
+		("/profile contractees", *select_query("users", {"contractor": username})),
+		("/stats rep users", *count_query("users", {"rep": rep, "status": (UserStatus.PASSED, UserStatus.LATE_PASS)})),
+		("/stats rep list", *select_query("users", {"rep": rep})),
+	]
+
+
+async def run(path: str, users: int, iterations: int, pragmas: tuple[str, ...]) -> dict[str, list[float]]:
+	pool = ConnectionPool(path, readers=1, reader_pragmas=pragmas)
+	await pool.open_readers()
+	timings: dict[str, list[float]] = {}
+	try:
+		async with pool.reader() as db:
+			for _ in range(iterations):
+				for name, query, params in lookups(users):
+					start = time.perf_counter()
+					async with db.execute(query, params) as cursor:
+						await cursor.fetchall()
+					timings.setdefault(name, []).append(time.perf_counter() - start)
+	finally:
+		await pool.close()
+	return timings
+
+
+async def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--users", type=int, default=20000)
+	parser.add_argument("--iterations", type=int, default=2000)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, "season.db")
+		season_db = SeasonDB("Read Benchmark", path)
+		await season_db.setup()
+		try:
+			await fill(season_db, args.users)
+			await season_db.checkpoint("TRUNCATE")
+		finally:
+			await season_db.close()
+
+		results = {}
+		for profile, pragmas in (("default", ()), ("reader", READER_PRAGMAS)):
+			await run(path, args.users, args.iterations // 10, pragmas)  # Warm up the OS page cache
+			results[profile] = await run(path, args.users, args.iterations, pragmas)
+
+	print(f"{args.users} users, {args.iterations} iterations, times in microseconds")
+	print(f"{'query':<24}{'default p50':>14}{'default p95':>14}{'reader p50':>14}{'reader p95':>14}")
+	for name in results["default"]:
+		row = f"{name:<24}"
+		for profile in ("default", "reader"):
+			timings = sorted(results[profile][name])
+			row += f"{statistics.median(timings) * 1e6:>14.1f}{timings[int(len(timings) * 0.95)] * 1e6:>14.1f}"
+		print(row)
+
+
+asyncio.run(main())
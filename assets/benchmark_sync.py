@@ -0,0 +1,225 @@
+# Run from the repository root: python assets/benchmark_sync.py [--sizes 1000,10000,100000] [--save-baseline] [--tolerance 0.25] [--process]
+# Syncs synthetic Winter 2025 sheets into temporary seasons: a cold sync into an empty database, a warm sync of the same rows under a new
+# revision, then a sync where 1% of participants changed. Each size runs in its own process so peak RSS isn't shared between sizes, and
+# allocations are measured in a second run with tracemalloc so tracing doesn't skew the timings. Sheets are read from JSON files, once
+# decoded all at once like a buffered response and once as a stream ("cold stream" etc.), add --no-stream to skip the streaming runs.
+# --process adds runs that parse in a worker process ("cold process" etc.). Every run reports the worst event loop lag seen while it
+# synced, i.e. how long a command would have waited for a response.
+from concurrent.futures import ProcessPoolExecutor, Executor
+import subprocess
+import tracemalloc
+import resource
+import tempfile
+import argparse
+import asyncio
+import random
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.getcwd())
+
+import utils  # noqa: E402
+from contracts import SeasonDB, SheetSource, FileSheetSource  # noqa: E402
+from contracts.seasons import Winter2025  # noqa: E402
+from contracts.sync import SyncReport  # noqa: E402
+
+BASELINE_PATH = "data/benchmarks/sync_baseline.json"
+SCENARIOS = ("cold", "warm", "churn")
+MODES = ("buffered", "stream", "process")
+LAG_INTERVAL = 0.005
+PASSED_CELLS = ["PASSED", "FAILED", "LATE PASS", ""]
+
+
+class SyntheticSheetSource(FileSheetSource):  # Warm syncs reuse the cold sheet, so the revision can't come from the file
+	def __init__(self, path: str, revision: str, stream: bool):
+		super().__init__(path, stream=stream)
+		self.revision = revision
+
+	async def get_revision(self, spreadsheet_id: str) -> str | None:
+		return self.revision
+
+
+def make_sheet(users: int, churned: set[int] = frozenset(), seed: int = 0) -> dict:  # Same seed and churn, same sheet
+	rng = random.Random(seed)
+	usernames = [f"participant{i}" for i in range(users)]
+	tabs: list[list[list[str]]] = [[] for _ in Winter2025.SHEET_RANGES]
+
+	for i, username in enumerate(usernames):
+		contractor = usernames[(i + 1) % users]
+		has_buddy = i % 4 == 0
+		changed = i in churned
+
+		names = [f"Title {i}-{k} (TV)" if k < 7 or has_buddy else "-" for k in range(9)]
+		passed = [rng.choice(PASSED_CELLS) for _ in range(9)]
+		status = rng.choice(["P", "F", "INC", "LP", ""])
+		if changed:
+			passed[0] = "PASSED" if passed[0] != "PASSED" else "FAILED"
+		tabs[0].append([status, username.upper(), *names, "", *passed])
+
+		base = [""] * 33
+		base[2], base[3], base[5] = f"rep{i % 40}", username, contractor
+		base[7] = f"https://anilist.co/user/{username}"
+		base[9], base[10], base[13] = "TV", rng.choice(["TRUE", "FALSE"]), "Manga"
+		base[16], base[17], base[18], base[19] = "Romance\nComedy", "Horror", "Yes", "No"
+		base[26], base[28] = str(rng.randint(1, 10)), str(rng.randint(1, 10))
+		base[29], base[30] = f"{rng.randint(0, 12) + changed}/13", f"{rng.randint(0, 4)}/4"
+		base[31], base[32] = f"https://reviews.example/{i}/base", f"https://reviews.example/{i}/challenge"
+		tabs[1].append(base)
+
+		tabs[2].append(["", "", username, "Title (TV)", contractor, "", f"{rng.randint(0, 2)}/2", "5", f"https://reviews.example/{i}/veteran"])
+		tabs[3].append(["", "", username, "", contractor, "6", f"https://reviews.example/{i}/vn"])
+		tabs[4].append(["", "", username, "", contractor, "7", f"https://reviews.example/{i}/movie", ""])
+		tabs[5].append(["", "", username, "", contractor, f"{rng.randint(0, 3)}/3", "8", f"https://reviews.example/{i}/indie"])
+		tabs[6].append(["", "", username, "", contractor, "4", f"https://reviews.example/{i}/extreme"])
+		if has_buddy:
+			tabs[7].append(["", "", username, "", contractor, "", contractor, "", "1/2", "2/2", "5", "6", "https://b/1", "https://b/2"])
+
+		if i % 20 == 0:
+			tabs[8].append([rng.choice(PASSED_CELLS), username, "", contractor, f"Aid {i}", "1/1", "9", f"https://reviews.example/{i}/aid"])
+		if i % 50 == 0:
+			tabs[8].append(["", f"newcomer{i}", "", contractor, f"Aid {i}", "0/1", "", ""])
+
+	return {
+		"spreadsheetId": "synthetic",
+		"valueRanges": [{"range": r, "majorDimension": "ROWS", "values": v} for r, v in zip(Winter2025.SHEET_RANGES, tabs)],
+	}
+
+
+async def run_sync(season_db: SeasonDB, source: SheetSource, executor: Executor | None) -> tuple[float, int, float]:  # See contracts.sync_season_db
+	async with season_db.connect(write=True) as db:
+		changes_before = db.total_changes
+
+	lag = utils.LoopLagMonitor(LAG_INTERVAL)
+	lag.start()
+	start = time.perf_counter()
+	report = SyncReport(season_db.name)
+	await Winter2025.sync_to_latest(season_db, report, source, executor=executor)
+	if not report.noop:
+		await season_db.checkpoint()
+		await season_db.mark_synced()
+	seconds = time.perf_counter() - start
+	await lag.stop()
+
+	async with season_db.connect(write=True) as db:
+		return seconds, db.total_changes - changes_before, lag.stats.lag_max
+
+
+def write_sheet(path: str, sheet_data: dict) -> str:
+	with open(path, "w", encoding="utf-8") as f:
+		json.dump(sheet_data, f, ensure_ascii=False)
+	return path
+
+
+async def run_worker(users: int, trace: bool, mode: str) -> dict[str, dict[str, float]]:
+	results: dict[str, dict[str, float]] = {}
+	with tempfile.TemporaryDirectory() as directory:
+		churned = set(random.Random(users).sample(range(users), max(1, users // 100)))
+		sheet = write_sheet(os.path.join(directory, "sheet.json"), make_sheet(users))
+		churned_sheet = write_sheet(os.path.join(directory, "churned.json"), make_sheet(users, churned))
+		stream = mode == "stream"
+		sources = {
+			"cold": SyntheticSheetSource(sheet, "cold", stream),
+			"warm": SyntheticSheetSource(sheet, "warm", stream),
+			"churn": SyntheticSheetSource(churned_sheet, "churn", stream),
+		}
+		executor = ProcessPoolExecutor(max_workers=1) if mode == "process" else None
+
+		season_db = SeasonDB("Sync Benchmark", os.path.join(directory, "season.db"))
+		await season_db.setup()
+		try:
+			if trace:
+				tracemalloc.start()
+			for scenario in SCENARIOS:
+				if trace:
+					tracemalloc.reset_peak()
+				seconds, writes, lag = await run_sync(season_db, sources[scenario], executor)
+				name = scenario if mode == "buffered" else f"{scenario} {mode}"
+				if trace:
+					results[name] = {"peak_alloc_mb": tracemalloc.get_traced_memory()[1] / 2**20}  # This process only, not the parsing worker
+				else:
+					peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Peak of the whole process so far
+					results[name] = {"seconds": seconds, "writes": writes, "peak_rss_mb": peak_rss, "max_lag_ms": lag * 1000}
+		finally:
+			await season_db.close()
+			if executor is not None:
+				executor.shutdown()
+
+	return results
+
+
+def run_size(users: int, modes: tuple[str, ...]) -> dict[str, dict[str, float]]:
+	results: dict[str, dict[str, float]] = {}
+	for mode in modes:
+		for trace in (False, True):
+			command = [sys.executable, __file__, "--worker", str(users), "--mode", mode] + (["--trace"] if trace else [])
+			output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+			for scenario, metrics in json.loads(output).items():
+				results.setdefault(scenario, {}).update(metrics)
+	return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+	regressions = []
+	for users, scenarios in results.items():
+		for scenario, metrics in scenarios.items():
+			for metric, value in metrics.items():
+				if metric == "max_lag_ms":  # A single slow wakeup decides it, too noisy to fail a run over
+					continue
+				previous = baseline.get(users, {}).get(scenario, {}).get(metric)
+				if previous is None:
+					continue
+				# Writes are deterministic, anything else is allowed some noise
+				limit = previous if metric == "writes" else previous * (1 + tolerance)
+				if value > limit:
+					regressions.append(f"{users} users, {scenario}: {metric} {value:.2f} > {previous:.2f}")
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--sizes", default="1000,10000,100000")
+	parser.add_argument("--baseline", default=BASELINE_PATH)
+	parser.add_argument("--save-baseline", action="store_true")
+	parser.add_argument("--tolerance", type=float, default=0.25)
+	parser.add_argument("--no-stream", action="store_true")
+	parser.add_argument("--process", action="store_true")
+	parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+	parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+	parser.add_argument("--mode", choices=MODES, default="buffered", help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.worker:
+		print(json.dumps(asyncio.run(run_worker(args.worker, args.trace, args.mode))))
+		return
+
+	results: dict[str, dict] = {}
+	modes = ("buffered",) + (() if args.no_stream else ("stream",)) + (("process",) if args.process else ())
+	print(f"{'users':>8}{'scenario':>16}{'seconds':>10}{'writes':>10}{'peak rss':>12}{'peak alloc':>12}{'max lag':>12}")
+	for users in map(int, args.sizes.split(",")):
+		results[str(users)] = run_size(users, modes)
+		for scenario, metrics in results[str(users)].items():
+			print(
+				f"{users:>8}{scenario:>16}{metrics['seconds']:>10.2f}{metrics['writes']:>10}"
+				f"{metrics['peak_rss_mb']:>9.1f} MB{metrics['peak_alloc_mb']:>9.1f} MB{metrics['max_lag_ms']:>9.0f} ms"
+			)
+
+	if args.save_baseline:
+		os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+		with open(args.baseline, "w") as f:
+			json.dump(results, f, indent=4)
+		print(f"Saved baseline to {args.baseline}")
+	elif os.path.isfile(args.baseline):
+		with open(args.baseline) as f:
+			regressions = compare(results, json.load(f), args.tolerance)
+		for regression in regressions:
+			print(f"REGRESSION {regression}")
+		if regressions:
+			sys.exit(1)
+		print(f"No regressions against {args.baseline}")
+	else:
+		print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+
+
+main()
@@ -0,0 +1,34 @@
+# Run from the repository root: python assets/check_query_plans.py
+# Exits with a non-zero status if any of the hot season queries falls back to a full table scan.
+import tempfile
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.getcwd())
+
+import utils  # noqa: E402, F401
+from contracts import SeasonDB  # noqa: E402
+
+
+async def main() -> int:
+	with tempfile.TemporaryDirectory() as directory:
+		season_db = SeasonDB("Query Plan Check", os.path.join(directory, "season.db"))
+		await season_db.setup()
+		try:
+			scans = await season_db.find_table_scans()
+		finally:
+			await season_db.close()
+
+	for name, details in scans.items():
+		print(f"{name}: {', '.join(details)}")
+
+	if scans:
+		print(f"{len(scans)} hot queries scan a table")
+		return 1
+
+	print("No hot query scans a table")
+	return 0
+
+
+sys.exit(asyncio.run(main()))
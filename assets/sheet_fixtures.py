@@ -0,0 +1,89 @@
+# Run from the repository root.
+#   python assets/sheet_fixtures.py record fixtures/winter2025.json      Records the live Winter 2025 sheet (needs GOOGLE_API_KEY)
+#   python assets/sheet_fixtures.py sync fixtures/winter2025.json out.db  Builds a season database from a recording
+#   Add --replay [--latency 0.3] [--max-rows 100] to sync through a local replay of the Sheets API instead of reading the file directly,
+#   and --stream to decode the response while it is read instead of all at once. --failures 3 makes the replay answer the first 3 requests
+#   with a 503, to check that syncs retry through a flaky API.
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.getcwd())
+
+import utils  # noqa: E402, F401
+from contracts import SeasonDB, SyncReport, LiveSheetSource, FileSheetSource, ReplaySheetServer, ReplaySheetSource, record_sheet  # noqa: E402
+from contracts.seasons import Winter2025  # noqa: E402
+
+
+async def record(path: str):
+	source = LiveSheetSource()
+	try:
+		await record_sheet(source, Winter2025.SPREADSHEET_ID, Winter2025.SHEET_RANGES, path)
+	finally:
+		await source.close()
+	print(f"Recorded {len(Winter2025.SHEET_RANGES)} ranges to {path}")
+
+
+async def sync(fixture: str, path: str, replay: bool, latency: float, max_rows: int | None, stream: bool, failures: int):
+	server = None
+	if replay:
+		with open(fixture, encoding="utf-8") as f:
+			server = ReplaySheetServer(json.load(f), latency=latency, max_rows=max_rows, failures=failures)
+		source = ReplaySheetSource(server, stream=stream)
+	else:
+		source = FileSheetSource(fixture, stream=stream)
+
+	season_db = SeasonDB("Fixture", path)
+	await season_db.setup()
+	try:
+		report = SyncReport("Fixture")
+		start = time.perf_counter()
+		await Winter2025.sync_to_latest(season_db, report, source)
+		report.duration = time.perf_counter() - start
+
+		users, contracts = await season_db.fetch_all()
+	finally:
+		await season_db.close()
+		await source.close()
+		if server is not None:
+			await server.stop()
+
+	# Same recording, same digest: rows are compared in a stable order, independent of ids assigned by earlier syncs
+	digest = hashlib.sha256(repr((sorted(map(repr, users)), sorted(repr((c.contractee, c.type, c.status, c.name)) for c in contracts))).encode())
+	print(f"Synced {len(users)} users and {len(contracts)} contracts in {report.duration:.2f} seconds ({'no-op' if report.noop else 'full'})")
+	for tab, tab_report in report.tabs.items():
+		print(f"  {tab}: {tab_report.changed} changed, {tab_report.skipped} skipped")
+	print(f"Content digest: {digest.hexdigest()}")
+	if server is not None:
+		stats = source.client.stats
+		print(f"HTTP: {stats.requests} requests, {stats.retries} retries, {stats.latency_avg * 1000:.0f}ms average latency")
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	commands = parser.add_subparsers(dest="command", required=True)
+
+	record_parser = commands.add_parser("record")
+	record_parser.add_argument("fixture")
+
+	sync_parser = commands.add_parser("sync")
+	sync_parser.add_argument("fixture")
+	sync_parser.add_argument("database")
+	sync_parser.add_argument("--replay", action="store_true")
+	sync_parser.add_argument("--latency", type=float, default=0.0)
+	sync_parser.add_argument("--max-rows", type=int, default=None)
+	sync_parser.add_argument("--stream", action="store_true")
+	sync_parser.add_argument("--failures", type=int, default=0)
+
+	args = parser.parse_args()
+	if args.command == "record":
+		asyncio.run(record(args.fixture))
+	else:
+		asyncio.run(sync(args.fixture, args.database, args.replay, args.latency, args.max_rows, args.stream, args.failures))
+
+
+main()
@@ -1,7 +1,6 @@
-from utils.contracts import get_common_embed, get_slash_usernames, get_usernames, get_target
+from utils.contracts import get_common_embed, get_slash_usernames, get_search_indexes, get_target
 from discord.ext import commands
 from typing import TYPE_CHECKING
-from thefuzz import process
 import contracts
 import logging
 import discord
@@ -59,9 +58,9 @@ async def create_error_embed(season_db: contracts.SeasonDB, username: str = None
 	error_embed.description = ":x: User not found!"
 
 	if username:
-		usernames = await get_usernames(season_db)
+		username_index, _ = await get_search_indexes(season_db)
 
-		fuzzy_results: list[tuple[str, int]] = process.extract(username, usernames, limit=1)
+		fuzzy_results: list[tuple[str, int]] = await username_index.suggest(username, limit=1)
 		if len(fuzzy_results) > 0:
 			fuzzy_username, fuzzy_confidence = fuzzy_results[0]
 			error_embed.description = f":x: User not found! Did you mean **{fuzzy_username}** ({fuzzy_confidence}%)?"
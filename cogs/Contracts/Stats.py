@@ -1,8 +1,7 @@
-from utils.contracts import get_common_embed, get_slash_reps, get_reps
+from utils.contracts import get_common_embed, get_slash_reps, get_search_indexes
 from utils import get_percentage
 from discord.ext import commands
 from typing import TYPE_CHECKING
-from thefuzz import process
 import contracts
 import logging
 import discord
@@ -14,54 +13,10 @@ if TYPE_CHECKING:
 
 async def create_embed(rep: str | None, season: str = config.BOT_CONFIG.active_season) -> discord.Embed:
 	season_db = await contracts.get_season_db(season)
+	stats = await season_db.fetch_stats(rep)
 
-	rep_users: list[contracts.User] = []
-
-	if not rep:
-		users_passed = await season_db.count_users(status=contracts.UserStatus.PASSED)
-		users_total = await season_db.count_users(
-			status=(
-				contracts.UserStatus.PASSED,
-				contracts.UserStatus.FAILED,
-				contracts.UserStatus.INCOMPLETE,
-				contracts.UserStatus.LATE_PASS,
-				contracts.UserStatus.PENDING,
-			)
-		)
-		contracts_passed = await season_db.count_contracts(status=contracts.ContractStatus.PASSED, kind=contracts.ContractKind.NORMAL)
-		contracts_total = await season_db.count_contracts(kind=contracts.ContractKind.NORMAL)
-		contract_types: dict[contracts.ContractType, list[int]] = {}
-
-		for contract in await season_db.fetch_contracts(kind=contracts.ContractKind.NORMAL):
-			type_status = contract_types.setdefault(contract.type, [0, 0])
-			type_status[1] += 1
-			if contract.status == contracts.ContractStatus.PASSED:
-				type_status[0] += 1
-	else:
-		users_passed = await season_db.count_users(
-			rep=rep,
-			status=(
-				contracts.UserStatus.PASSED,
-				contracts.UserStatus.FAILED,
-				contracts.UserStatus.INCOMPLETE,
-				contracts.UserStatus.LATE_PASS,
-				contracts.UserStatus.PENDING,
-			),
-		)
-		users_total = await season_db.count_users(rep=rep)
-		contracts_passed = contracts_total = 0
-
-		rep_users = await season_db.fetch_users(rep=rep)
-		contract_types: dict[contracts.ContractType, list[int]] = {}
-
-		for user in rep_users:
-			for contract in await season_db.fetch_contracts(contractee=user.username, kind=contracts.ContractKind.NORMAL):
-				type_status = contract_types.setdefault(contract.type, [0, 0])
-				contracts_total += 1
-				type_status[1] += 1
-				if contract.status == contracts.ContractStatus.PASSED:
-					contracts_passed += 1
-					type_status[0] += 1
+	users_passed, users_total = stats.users_passed, stats.users_total
+	contracts_passed, contracts_total = stats.contracts_passed, stats.contracts_total
 
 	embed = get_common_embed(season=season)
 	embed.title = f"Contracts {season}" if not rep else f"Contracts {season} - {rep}"
@@ -70,20 +25,11 @@ async def create_embed(rep: str | None, season: str = config.BOT_CONFIG.active_s
 	embed.description += f"\n> **Users passed**: {users_passed}/{users_total} ({get_percentage(users_passed, users_total)}%)"
 	embed.description += f"\n> **Contracts passed**: {contracts_passed}/{contracts_total} ({get_percentage(contracts_passed, contracts_total)}%)"
 	embed.description += "\n\n **Contracts**:"
-	for c_type, c_stats in contract_types.items():
+	for c_type, c_stats in stats.contract_types().items():
 		embed.description += f"\n> **{c_type}**: {c_stats[0]}/{c_stats[1]} ({get_percentage(c_stats[0], c_stats[1])}%)"
-	if not rep:
-		total_aids = await season_db.count_contracts(kind=contracts.ContractKind.AID)
-		passed_aids = await season_db.count_contracts(status=contracts.ContractStatus.PASSED, kind=contracts.ContractKind.AID)
-	else:
-		rep_usernames = (*[user.username for user in rep_users],)
-		total_aids = await season_db.count_contracts(contractee=rep_usernames, kind=contracts.ContractKind.AID)
-		passed_aids = await season_db.count_contracts(
-			contractee=rep_usernames, status=contracts.ContractStatus.PASSED, kind=contracts.ContractKind.AID
-		)
-
-	if total_aids > 0:
-		embed.description += f"\n> **Aids**: {passed_aids}/{total_aids} ({get_percentage(passed_aids, total_aids)}%)"
+
+	if stats.aids_total > 0:
+		embed.description += f"\n> **Aids**: {stats.aids_passed}/{stats.aids_total} ({get_percentage(stats.aids_passed, stats.aids_total)}%)"
 
 	return embed
 
@@ -92,9 +38,9 @@ async def create_error_embed(season_db: contracts.SeasonDB, rep: str) -> discord
 	error_embed = discord.Embed(color=discord.Color.red())
 	error_embed.description = ":x: Invalid rep!"
 
-	reps = await get_reps(season_db)
+	_, rep_index = await get_search_indexes(season_db)
 
-	fuzzy_results: list[tuple[str, int]] = process.extract(rep, reps, limit=1)
+	fuzzy_results: list[tuple[str, int]] = await rep_index.suggest(rep, limit=1)
 	if len(fuzzy_results) > 0:
 		fuzzy_rep, fuzzy_confidence = fuzzy_results[0]
 		error_embed.description = f":x: Invalid rep! Did you mean **{fuzzy_rep}** ({fuzzy_confidence}%)?"
@@ -124,20 +70,20 @@ class ContractsStats(commands.Cog):
 	@discord.option("hidden", description="Optionally make the response only visible to you", default=False)
 	async def stats(self, ctx: discord.ApplicationContext, rep: str, season: str, hidden: bool):
 		season_db = await contracts.get_season_db(season)
-		reps = await get_reps(season_db)
-		if rep and rep.upper() not in reps:
+		_, rep_index = await get_search_indexes(season_db)  # The same reps the error embed suggests from
+		if rep and rep_index.get(rep) is None:
 			return await ctx.respond(embed=await create_error_embed(season_db, rep.upper()), ephemeral=hidden)
 
-		await ctx.respond(embed=await create_embed(rep.upper() if rep else None, season), ephemeral=hidden)
+		await ctx.respond(embed=await create_embed(rep_index.get(rep) if rep else None, season), ephemeral=hidden)
 
 	@commands.command(name="stats", aliases=["s"], help="Check the season's stats")
 	async def text_stats(self, ctx: commands.Context, *, rep: str = None):
 		season_db = await contracts.get_season_db()
-		reps = await get_reps(season_db)
-		if rep and rep.upper() not in reps:
+		_, rep_index = await get_search_indexes(season_db)
+		if rep and rep_index.get(rep) is None:
 			return await ctx.reply(embed=await create_error_embed(season_db, rep.upper()))
 
-		await ctx.reply(embed=await create_embed(rep.upper() if rep else None))
+		await ctx.reply(embed=await create_embed(rep_index.get(rep) if rep else None))
 
 
 def setup(bot):
@@ -25,15 +25,31 @@ class Contracts(commands.Cog):
 
 		self.change_user_status.start()
 
-	@tasks.loop(minutes=30)
-	async def change_user_status(self):
-		season_db = await contracts.get_season_db()
-		users_passed = await season_db.count_users(status=contracts.UserStatus.PASSED)
-		users_total = await season_db.count_users()
+	async def set_user_status(self):
+		season_db = await contracts.get_season_db(config.BOT_CONFIG.active_season)
+		stats = await season_db.fetch_stats()
 		await self.bot.change_presence(
-			status=discord.Status.online, activity=discord.CustomActivity(name=f"{users_passed}/{users_total} users passed | %help")
+			status=discord.Status.online, activity=discord.CustomActivity(name=f"{stats.users_passed}/{stats.users_total} users passed | %help")
 		)
 
+	# Discord drops the presence when the bot identifies again, so it's set again on every ready and resume, not just after syncs
+	@commands.Cog.listener()
+	async def on_ready(self):
+		await self.set_user_status()
+
+	@commands.Cog.listener()
+	async def on_resumed(self):
+		await self.set_user_status()
+
+	# Set after every sync that changed something, instead of fetching the stats again every 30 minutes
+	@tasks.loop(count=1)
+	async def change_user_status(self):
+		events = self.bot.events.subscribe(contracts.SyncCompleted)
+		await self.set_user_status()
+		async for event in events:
+			if event.season == config.BOT_CONFIG.active_season:
+				await self.set_user_status()
+
 	@change_user_status.before_loop
 	async def before_loop(self):
 		if not self.bot.is_ready():
@@ -29,15 +29,103 @@ class Owner(commands.Cog):
 	async def sync_season(self, ctx: commands.Context, *, season: str = BOT_CONFIG.active_season):
 		async with ctx.typing():
 			try:
-				duration = await contracts.sync_season_db(season)
-				self.logger.info(f"{season} has been manually synced by {ctx.author.name} in {duration:.2f} seconds")
-				await ctx.reply(
-					embed=discord.Embed(description=f"✅ **{season}** has been synced in {duration:.2f} seconds!", color=BASE_EMBED_COLOR)
+				report = await self.bot.sync_season(season)
+				if report.noop:
+					self.logger.info(
+						f"{season} was manually synced by {ctx.author.name}, unchanged since {report.revision} ({report.duration:.2f} seconds)"
+					)
+					embed = discord.Embed(
+						description=f"✅ **{season}** hasn't changed since the last sync, checked in {report.duration:.2f} seconds.",
+						color=BASE_EMBED_COLOR,
+					)
+					await ctx.reply(embed=embed)
+					return
+
+				tabs = ", ".join(f"{tab} {tab_report.changed}/{tab_report.changed + tab_report.skipped}" for tab, tab_report in report.tabs.items())
+				self.logger.info(
+					f"{season} has been manually synced by {ctx.author.name} in {report.duration:.2f} seconds "
+					f"({report.changed} rows changed, {report.skipped} skipped: {tabs})"
 				)
+				embed = discord.Embed(description=f"✅ **{season}** has been synced in {report.duration:.2f} seconds!", color=BASE_EMBED_COLOR)
+				embed.description += f"\n> **Rows changed**: {report.changed} ({report.skipped} unchanged rows skipped)"
+				for tab, tab_report in report.tabs.items():
+					if tab_report.changed:
+						embed.description += f"\n> **{tab}**: {tab_report.changed} changed, {tab_report.skipped} skipped"
+				await ctx.reply(embed=embed)
 			except Exception as e:
 				self.logger.error(f"Failed to sync season '{season}' manually by {ctx.author.name}: {e}")
 				await ctx.reply(embed=discord.Embed(description=f"❌ Failed to sync **{season}**:\n```{e}```", color=discord.Color.red()))
 
+	@commands.command(hidden=True)
+	@commands.is_owner()
+	async def archive_season(self, ctx: commands.Context, *, season: str = BOT_CONFIG.active_season):
+		async with ctx.typing():
+			try:
+				path = await contracts.archive_season(season)
+				self.logger.info(f"{season} has been archived to {path} by {ctx.author.name}")
+				await ctx.reply(
+					embed=discord.Embed(description=f"✅ **{season}** has been archived and will no longer sync.", color=BASE_EMBED_COLOR)
+				)
+			except Exception as e:
+				self.logger.error(f"Failed to archive season '{season}' by {ctx.author.name}: {e}")
+				await ctx.reply(embed=discord.Embed(description=f"❌ Failed to archive **{season}**:\n```{e}```", color=discord.Color.red()))
+
+	@commands.command(hidden=True, aliases=["dbs"])
+	@commands.is_owner()
+	async def db_stats(self, ctx: commands.Context):
+		embed = discord.Embed(color=BASE_EMBED_COLOR, description="")
+		for season, season_db in contracts.OPEN_SEASON_DBS.items():
+			stats = season_db.pool_stats()
+			embed.description += f"**{season}**"
+			embed.description += (
+				f"\n> **Readers in use**: {stats.readers_in_use}/{stats.readers} ({stats.utilisation:.0%}, peak {stats.readers_peak})"
+			)
+			embed.description += (
+				f"\n> **Reader wait**: {stats.reader_wait_avg * 1000:.2f}ms avg, {stats.reader_wait_max * 1000:.2f}ms max "
+				f"over {stats.reader_acquisitions} acquisitions"
+			)
+			embed.description += (
+				f"\n> **Writer wait**: {stats.writer_wait_avg * 1000:.2f}ms avg, {stats.writer_wait_max * 1000:.2f}ms max "
+				f"over {stats.writer_acquisitions} acquisitions"
+			)
+			if report := contracts.LAST_SYNC_REPORTS.get((season, False)):
+				embed.description += f"\n> **Last sync**: {report.duration * 1000:.0f}ms ({report.changed} rows changed, {report.skipped} skipped)"
+			if report := contracts.LAST_SYNC_REPORTS.get((season, True)):
+				embed.description += f"\n> **Last no-op sync**: {report.duration * 1000:.0f}ms"
+			embed.description += "\n"
+
+		if not embed.description:
+			embed.description = "No season databases are open.\n"
+
+		http_stats = self.bot.http_client.stats
+		embed.description += (
+			f"**HTTP**\n> **Requests**: {http_stats.requests} ({http_stats.retries} retries, {http_stats.failures} failed)"
+			f"\n> **Latency**: {http_stats.latency_avg * 1000:.0f}ms avg, {http_stats.latency_max * 1000:.0f}ms max"
+		)
+		lag_stats = self.bot.loop_lag.stats
+		embed.description += (
+			f"\n**Event loop**\n> **Lag**: {lag_stats.lag_avg * 1000:.1f}ms avg, {lag_stats.lag_max * 1000:.0f}ms max over {lag_stats.samples} samples"
+			f"\n> **Sync parsing**: {'worker process' if self.bot.sync_executor else 'event loop'}"
+		)
+		await ctx.reply(embed=embed)
+
+	@commands.command(hidden=True)
+	@commands.is_owner()
+	async def verify_stats(self, ctx: commands.Context, *, season: str = BOT_CONFIG.active_season):
+		async with ctx.typing():
+			season_db = await contracts.get_season_db(season)
+			mismatched = await season_db.verify_stats()
+			if not mismatched:
+				await ctx.reply(embed=discord.Embed(description=f"✅ **{season}** stats match a full recount.", color=BASE_EMBED_COLOR))
+				return
+
+			await season_db.rebuild_stats()
+			scopes = ", ".join(scope or "season" for scope in mismatched)
+			self.logger.warning(f"{season} stats did not match a full recount for {scopes}, rebuilt by {ctx.author.name}")
+			await ctx.reply(
+				embed=discord.Embed(description=f"⚠️ **{season}** stats were out of date for {scopes} and have been rebuilt.", color=BASE_EMBED_COLOR)
+			)
+
 	@commands.command(hidden=True)
 	@commands.is_owner()
 	async def delete_message(self, ctx: commands.Context, message_id: int, channel_id: int = None):
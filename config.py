@@ -14,6 +14,7 @@ class Config:
 	repository_link: str
 	DEADLINE: str
 	active_season: str
+	parse_in_worker: bool = False  # Parse syncs in a worker process, keeping the event loop free for the gateway and commands
 
 
 with open("config.yaml", "r") as file:
@@ -1,30 +1,117 @@
+from concurrent.futures import Executor
+import datetime
 import time
+import os
 from .classes import SeasonDB
+from .sync import SyncReport
+from .sources import SheetSource, LiveSheetSource
+from .events import EventBus, SyncEvent, SyncCompleted
 from .seasons import Winter2025
 from .classes import *  # noqa: F403
-from config import BOT_CONFIG
+from .sync import *  # noqa: F403
+from .sources import *  # noqa: F403
+from .client import *  # noqa: F403
+from .events import *  # noqa: F403
+from config import BOT_CONFIG, DEADLINE_TIMESTAMP
 
 AVAILABLE_SEASONS = ["Winter 2025"]
+ARCHIVE_PATH = "data/seasons/archive"
+OPEN_SEASON_DBS: dict[str, SeasonDB] = {}
+LAST_SYNC_REPORTS: dict[tuple[str, bool], SyncReport] = {}  # (season, noop) -> report, so no-op syncs are timed separately
+
+
+def get_archive_path(season: str) -> str:
+	return os.path.join(ARCHIVE_PATH, f"{season.replace(' ', '')}.db")
+
+
+def is_season_frozen(season: str) -> bool:  # Archived seasons are read from their archive and never synced again
+	return os.path.isfile(get_archive_path(season))
 
 
 async def get_season_db(season: str = BOT_CONFIG.active_season) -> SeasonDB:
 	if season not in AVAILABLE_SEASONS:
 		raise ValueError(f"Invalid season: {season}")
 
+	if is_season_frozen(season):
+		if (db := OPEN_SEASON_DBS.get(season)) and db.frozen:
+			return db
+
+		db = SeasonDB(season, get_archive_path(season), frozen=True)
+		await db.setup()
+	else:
+		match season:
+			case "Winter 2025":
+				db = await Winter2025.get_database()
+
+	OPEN_SEASON_DBS[season] = db
+	return db
+
+
+async def archive_season(season: str) -> str:  # Returns the archive's path
+	if season not in AVAILABLE_SEASONS:
+		raise ValueError(f"Invalid season: {season}")
+	if is_season_frozen(season):
+		raise ValueError(f"{season} is already archived")
+	if season == BOT_CONFIG.active_season and datetime.datetime.now(datetime.UTC) < DEADLINE_TIMESTAMP:
+		raise ValueError(f"{season} is still ongoing")
+
+	db = await get_season_db(season)
+	path = get_archive_path(season)
+	await db.archive(path)
+
+	# Later lookups open the archive instead
+	await db.close()
+	OPEN_SEASON_DBS.pop(season, None)
 	match season:
 		case "Winter 2025":
-			return await Winter2025.get_database()
+			Winter2025.get_database.cache_clear()
+
+	return path
 
 
-async def sync_season_db(season: str = BOT_CONFIG.active_season) -> float:  # Returns duration of sync
+async def close_season_dbs():
+	for db in OPEN_SEASON_DBS.values():
+		await db.close()
+	OPEN_SEASON_DBS.clear()
+	Winter2025.get_database.cache_clear()
+
+
+async def sync_season_db(
+	season: str = BOT_CONFIG.active_season, source: SheetSource | None = None, bus: EventBus | None = None, executor: Executor | None = None
+) -> SyncReport:
 	if season not in AVAILABLE_SEASONS:
 		raise ValueError(f"Invalid season: {season}")
 
+	if is_season_frozen(season):
+		raise ValueError(f"{season} is archived and can no longer be synced")
+
 	db = await get_season_db(season)
 	start = time.perf_counter()
 
-	match season:
-		case "Winter 2025":
-			await Winter2025.sync_to_latest(db)
+	report = SyncReport(season)
+	events: list[SyncEvent] | None = [] if bus is not None else None
+	sheet_source = source or LiveSheetSource()
+	try:
+		match season:
+			case "Winter 2025":
+				await Winter2025.sync_to_latest(db, report, sheet_source, events, executor)
+	finally:
+		if source is None:
+			await sheet_source.close()
+
+	if not report.noop:  # Nothing was written, so the snapshot and caches are still current
+		await db.checkpoint()
+		await db.mark_synced()
+	report.duration = time.perf_counter() - start
+	LAST_SYNC_REPORTS[(season, report.noop)] = report
+
+	if bus is not None and not report.noop:  # Published last, so subscribers that query the season see this sync's writes
+		bus.publish(events)
+		bus.publish([SyncCompleted(season, report.revision, report.changed)])
+	return report
+
 
-	return time.perf_counter() - start
+async def maintain_season_dbs():
+	for db in OPEN_SEASON_DBS.values():
+		if not db.frozen:
+			await db.run_maintenance()
@@ -1,15 +1,50 @@
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from enum import StrEnum, Enum
+from functools import cache
+from itertools import groupby
+from typing import Callable, Iterable, Iterator
+from operator import itemgetter
+from .pool import ConnectionPool, PoolStats
+from .query import check_columns, select_query, count_query
+from .snapshot import SeasonSnapshot
+from .sync import TabReport, ChangeSet, Change, CreateUser, UpdateUser, CreateContract, UpdateContract, SetRowHash, SetMeta, hash_rows
+from . import schema
+import itertools
 import os
 import aiosqlite
 from async_lru import alru_cache
 
-__all__ = ["ContractType", "UserStatus", "ContractStatus", "ContractKind", "Contract", "User", "SeasonDB", "SeasonSyncContext"]
-
-with open("contracts/Season.sql") as f:
-	season_script = f.read()
-CACHE_DURATION_MINUTES = 3
+__all__ = [
+	"ContractType",
+	"UserStatus",
+	"ContractStatus",
+	"ContractKind",
+	"Contract",
+	"User",
+	"SeasonStats",
+	"SeasonDB",
+	"SeasonWriteSession",
+	"SeasonSyncContext",
+	"PoolStats",
+	"compile_changes",
+]
+
+STATS_REBUILD_QUERIES = (
+	"DELETE FROM season_stats",
+	"INSERT INTO season_stats (scope, kind, type, status, count) SELECT '', -1, '', status, COUNT(*) FROM users GROUP BY status",
+	"INSERT INTO season_stats (scope, kind, type, status, count) "
+	"SELECT rep, -1, '', status, COUNT(*) FROM users WHERE coalesce(rep, '') != '' GROUP BY rep, status",
+	"INSERT INTO season_stats (scope, kind, type, status, count, first_id) "
+	"SELECT '', kind, type, status, COUNT(*), MIN(id) FROM contracts GROUP BY kind, type, status",
+	"INSERT INTO season_stats (scope, kind, type, status, count, first_id) "
+	"SELECT u.rep, c.kind, c.type, c.status, COUNT(*), MIN(c.id) FROM contracts c JOIN users u ON u.username = c.contractee "
+	"WHERE coalesce(u.rep, '') != '' GROUP BY u.rep, c.kind, c.type, c.status",
+)
+ROW_HASH_UPSERT = "INSERT INTO sheet_row_hashes (tab, key, hash) VALUES (:tab, :key, :hash) ON CONFLICT (tab, key) DO UPDATE SET hash = excluded.hash"
+META_UPSERT = "INSERT INTO season_meta (key, value) VALUES (:key, :value) ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+CACHE_MAXSIZE = 1024  # Shared by every season and keyed by the sync version, so entries never go stale, older ones just age out
+APPLY_BATCH_SIZE = 1000
 
 
 class ContractType(StrEnum):
@@ -97,6 +132,81 @@ class User:
 		return False
 
 
+@dataclass(slots=True)
+class SeasonStats:
+	users: dict[UserStatus, int] = field(default_factory=dict)
+	contracts: dict[ContractType, dict[ContractStatus, int]] = field(default_factory=dict)  # Normal contracts, in order of first appearance
+	aids: dict[ContractStatus, int] = field(default_factory=dict)
+
+	@property
+	def users_passed(self) -> int:
+		return self.users.get(UserStatus.PASSED, 0)
+
+	@property
+	def users_total(self) -> int:
+		return sum(count for status, count in self.users.items() if status != UserStatus.AIDS_NEWCOMER)
+
+	@property
+	def contracts_passed(self) -> int:
+		return sum(statuses.get(ContractStatus.PASSED, 0) for statuses in self.contracts.values())
+
+	@property
+	def contracts_total(self) -> int:
+		return sum(sum(statuses.values()) for statuses in self.contracts.values())
+
+	@property
+	def aids_passed(self) -> int:
+		return self.aids.get(ContractStatus.PASSED, 0)
+
+	@property
+	def aids_total(self) -> int:
+		return sum(self.aids.values())
+
+	def contract_types(self) -> dict[ContractType, tuple[int, int]]:  # type -> (passed, total)
+		return {type: (statuses.get(ContractStatus.PASSED, 0), sum(statuses.values())) for type, statuses in self.contracts.items()}
+
+
+def _construct_stats(user_counts: Iterable[tuple], contract_counts: Iterable[tuple]) -> SeasonStats:
+	stats = SeasonStats()
+	for status, count in user_counts:
+		stats.users[UserStatus(status)] = count
+
+	for kind, type, status, count in contract_counts:
+		if ContractKind(kind) == ContractKind.AID:
+			statuses = stats.aids
+		else:
+			statuses = stats.contracts.setdefault(ContractType(type), {})
+		statuses[ContractStatus(status)] = statuses.get(ContractStatus(status), 0) + count
+
+	return stats
+
+
+def _construct_stored_stats(rows: list[tuple]) -> SeasonStats:  # season_stats rows of one scope, user rows have kind -1
+	return _construct_stats([(status, count) for kind, _, status, count in rows if kind == -1], [row for row in rows if row[0] != -1])
+
+
+COLUMN_CONVERTERS: dict[str, dict[str, Callable]] = {
+	"users": {"status": UserStatus, "veto_used": bool, "accepting_manhwa": bool, "accepting_ln": bool},
+	"contracts": {"type": ContractType, "kind": ContractKind, "status": ContractStatus, "optional": bool},
+}
+
+
+def _record_property(i: int, convert: Callable | None) -> property:
+	if convert is None:
+		return property(itemgetter(i))
+	return property(lambda self: convert(tuple.__getitem__(self, i)))  # Converted on access, never stored
+
+
+@cache
+def _record_type(table: str, fields: tuple[str, ...]) -> type[tuple]:  # Tuple-backed stand-in for User/Contract with only some columns
+	check_columns(table, fields)
+	namespace = {"__slots__": (), "_fields": fields}
+	for i, column in enumerate(fields):
+		namespace[column] = _record_property(i, COLUMN_CONVERTERS[table].get(column))
+	namespace["__repr__"] = lambda self: f"{type(self).__name__}({', '.join(f'{column}={getattr(self, column)!r}' for column in fields)})"
+	return type("UserRecord" if table == "users" else "ContractRecord", (tuple,), namespace)
+
+
 def _construct_user(row: list) -> User:
 	return User(
 		username=row[0],
@@ -130,285 +240,437 @@ def _construct_contract(row: list) -> Contract:
 	)
 
 
+@cache
+def _insert_query(table: str, columns: tuple[str, ...]) -> str:
+	return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(f':{col}' for col in columns)})"
+
+
+@cache
+def _update_query(table: str, key: str, columns: tuple[str, ...]) -> str:
+	return f"UPDATE {table} SET {', '.join(f'{col} = :{col}' for col in columns)} WHERE {key} = :{key}"
+
+
+def _to_params(values: dict) -> dict:
+	return {key: value.value if isinstance(value, Enum) else value for key, value in values.items()}
+
+
+def _to_statement(change: Change) -> tuple[str, dict]:
+	match change:
+		case CreateUser(username, values):
+			params = _to_params({"username": username, **values})
+			return _insert_query("users", tuple(params)), params
+		case UpdateUser(username, values):
+			params = _to_params(values)
+			return _update_query("users", "username", tuple(params)), {"username": username, **params}
+		case CreateContract(id, values):
+			params = _to_params({"id": id, **values})
+			return _insert_query("contracts", tuple(params)), params
+		case UpdateContract(id, values):
+			params = _to_params(values)
+			return _update_query("contracts", "id", tuple(params)), {"id": id, **params}
+		case SetRowHash(tab, key, hash):
+			return ROW_HASH_UPSERT, {"tab": tab, "key": key, "hash": hash}
+		case SetMeta(key, value):
+			return META_UPSERT, {"key": key, "value": value}
+
+
+def _group_statements(changes: Iterable[Change]) -> Iterator[tuple[str, Iterator[dict]]]:
+	# Consecutive statements of the same shape are grouped to go out as one executemany, keeping the original order of writes
+	for query, group in groupby(map(_to_statement, changes), key=itemgetter(0)):
+		yield query, map(itemgetter(1), group)
+
+
+def compile_changes(changes: Iterable[Change]) -> list[tuple[str, list[dict]]]:  # Plain queries and parameters, quick to send between processes
+	return [(query, list(params)) for query, params in _group_statements(changes)]
+
+
+class SeasonWriteSession(ChangeSet):  # Collects writes and applies them in a single transaction, see SeasonDB.write_session
+	def __init__(self, next_contract_id: int):
+		super().__init__(itertools.count(next_contract_id))
+		self.statements: list[tuple[str, list[dict]]] = []  # From compile_changes, applied before changes
+
+	async def apply(self, db: aiosqlite.Connection):
+		# In batches, so building their parameters never holds up the event loop for long
+		for query, params in itertools.chain(self.statements, _group_statements(self.changes)):
+			params = iter(params)
+			while batch := list(itertools.islice(params, APPLY_BATCH_SIZE)):
+				await db.executemany(query, batch)
+
+
 class SeasonDB:
-	def __init__(self, name: str, path: str):
+	def __init__(self, name: str, path: str, readers: int = 4, in_memory: bool = False, frozen: bool = False):
 		self.name = name
 		self.path = path
+		self.frozen = frozen  # An archived season, read straight from its immutable file without a snapshot
+		self.pool = ConnectionPool(path, readers, immutable=frozen)
+		self.in_memory = in_memory and not frozen
+		self.snapshot: SeasonSnapshot | None = None
+		self.version = 0  # Bumped every time a sync commits
+		self.sync_hooks: list[Callable[["SeasonDB"], None]] = []
+		self.close_hooks: list[Callable[["SeasonDB"], None]] = []  # For anything kept per season, so it doesn't outlive the database
 
 	@asynccontextmanager
-	async def connect(self):
-		async with aiosqlite.connect(self.path) as db:
+	async def connect(self, write: bool = False):
+		async with self.pool.writer() if write else self.pool.reader() as db:
 			yield db
 
 	async def setup(self):
+		if self.frozen:
+			if not os.path.isfile(self.path):
+				raise FileNotFoundError(f"No archive for {self.name} at {self.path}")
+			await self.pool.open_readers()
+			return
+
 		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		await self.pool.open_writer()
+		async with self.connect(write=True) as db:
+			await schema.migrate(db)
+		await self.pool.open_readers()
+		await self.refresh_snapshot()
+
+	async def close(self):
+		for hook in self.close_hooks:
+			hook(self)
+		await self.pool.close()
+		self.snapshot = None
+
+	async def fetch_all(self) -> tuple[list[User], list[Contract]]:  # Always read from SQLite, even with a snapshot
 		async with self.connect() as db:
-			await db.executescript(season_script)
-			await db.commit()
+			return await self._read_all(db)
 
-	async def create_user(self, username: str, status: UserStatus, **kwargs):
-		columns = ["username", "status"]
-		values = {"username": username, "status": status.value}
+	@staticmethod
+	async def _read_all(db: aiosqlite.Connection) -> tuple[list[User], list[Contract]]:
+		async with db.execute(*select_query("users", {})) as cursor:
+			users = [_construct_user(row) for row in await cursor.fetchall()]
+		async with db.execute(*select_query("contracts", {})) as cursor:
+			contracts = [_construct_contract(row) for row in await cursor.fetchall()]
+		return users, contracts
 
-		for key, value in kwargs.items():
-			columns.append(key)
-			values[key] = value.value if isinstance(value, Enum) else value
+	async def refresh_snapshot(self):
+		if not self.in_memory:
+			return
 
-		columns_str = ", ".join(columns)
-		placeholders_str = ", ".join(f":{col}" for col in columns)
+		async with self.connect() as db:
+			await db.execute("BEGIN")  # One read transaction, so rows and stats come from the same commit
+			try:
+				users, contracts = await self._read_all(db)
+				async with db.execute("SELECT scope, kind, type, status, count FROM season_stats WHERE count != 0 ORDER BY first_id") as cursor:
+					stats_rows: dict[str, list[tuple]] = {}
+					for scope, *row in await cursor.fetchall():
+						stats_rows.setdefault(scope, []).append(row)
+			finally:
+				await db.rollback()
+
+		stats = {scope: _construct_stored_stats(rows) for scope, rows in stats_rows.items()}
+		self.snapshot = SeasonSnapshot(users, contracts, stats)
+
+	def add_sync_hook(self, hook: Callable[["SeasonDB"], None]):
+		if hook not in self.sync_hooks:
+			self.sync_hooks.append(hook)
+
+	def add_close_hook(self, hook: Callable[["SeasonDB"], None]):
+		if hook not in self.close_hooks:
+			self.close_hooks.append(hook)
+
+	async def mark_synced(self):
+		await self.refresh_snapshot()
+		self.version += 1
+		for hook in self.sync_hooks:
+			hook(self)
+
+	async def get_meta(self, key: str) -> str | None:
+		async with self.connect() as db:
+			async with db.execute("SELECT value FROM season_meta WHERE key = ?", (key,)) as cursor:
+				row = await cursor.fetchone()
+				return row[0] if row else None
 
-		query = f"""
-		INSERT INTO users ({columns_str})
-		VALUES ({placeholders_str})
-		"""
+	async def checkpoint(self, mode: str = "PASSIVE") -> tuple[int, int, int]:  # (busy, wal pages, checkpointed pages)
+		if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+			raise ValueError(f"Invalid checkpoint mode: {mode}")
 
-		async with self.connect() as db:
-			await db.execute(query, values)
-			await db.commit()
+		async with self.connect(write=True) as db:
+			async with db.execute(f"PRAGMA wal_checkpoint({mode})") as cursor:
+				return tuple(await cursor.fetchone())
 
-	async def create_contract(self, name: str, type: ContractType, kind: ContractKind, status: ContractStatus, contractee: str, **kwargs) -> int:
-		columns = ["name", "type", "kind", "status", "contractee"]
-		values = {"name": name, "type": type.value, "kind": kind.value, "status": status.value, "contractee": contractee}
+	async def run_maintenance(self) -> tuple[int, int, int]:
+		async with self.connect(write=True) as db:
+			await db.execute("PRAGMA optimize")
+		return await self.checkpoint("TRUNCATE")
 
-		for key, value in kwargs.items():
-			columns.append(key)
-			values[key] = value.value if isinstance(value, Enum) else value
+	async def archive(self, path: str):  # Packs the season into a standalone file that can be opened with frozen=True
+		if self.frozen:
+			raise ValueError(f"{self.name} is already archived")
 
-		columns_str = ", ".join(columns)
-		placeholders_str = ", ".join(f":{col}" for col in columns)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		temp_path = f"{path}.tmp"
+		if os.path.exists(temp_path):
+			os.remove(temp_path)
 
-		query = f"""
-		INSERT INTO contracts ({columns_str})
-		VALUES ({placeholders_str})
-		"""
+		async with self.connect(write=True) as db:
+			await db.execute("PRAGMA optimize")
+			await db.execute("VACUUM INTO ?", (temp_path,))
 
-		async with self.connect() as db:
-			cursor = await db.execute(query, values)
-			await db.commit()
-			return cursor.lastrowid
-
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
-	async def fetch_user(self, **kwargs) -> User | None:
-		query_conditions = []
-		params = {}
-		param_counter = 0
-		for key, value in kwargs.items():
-			if isinstance(value, tuple):
-				placeholders = []
-				for v in value:
-					param_key = f"{key}_{param_counter}"
-					param_counter += 1
-					placeholders.append(f":{param_key}")
-					params[param_key] = v.value if isinstance(v, Enum) else v
-				query_conditions.append(f"{key} IN ({', '.join(placeholders)})")
-			else:
-				if isinstance(value, Enum):
-					value = value.value
-				query_conditions.append(f"{key} = :{key}")
-				params[key] = value
-		query = "SELECT * FROM users"
-		if query_conditions:
-			query += " WHERE " + " AND ".join(query_conditions)
-		query += " LIMIT 1"
+		# Rollback journal instead of WAL, so the archive is a single file
+		async with aiosqlite.connect(temp_path) as db:
+			await db.execute("PRAGMA journal_mode = DELETE")
+		os.replace(temp_path, path)
 
-		async with self.connect() as db:
-			async with db.execute(query, params) as cursor:
-				row = await cursor.fetchone()
-				if row:
-					return _construct_user(row)
-				return None
-
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
-	async def fetch_contract(self, **kwargs) -> Contract | None:
-		query_conditions = []
-		params = {}
-		param_counter = 0
-		for key, value in kwargs.items():
-			if isinstance(value, tuple):
-				placeholders = []
-				for v in value:
-					param_key = f"{key}_{param_counter}"
-					param_counter += 1
-					placeholders.append(f":{param_key}")
-					params[param_key] = v.value if isinstance(v, Enum) else v
-				query_conditions.append(f"{key} IN ({', '.join(placeholders)})")
-			else:
-				if isinstance(value, Enum):
-					value = value.value
-				query_conditions.append(f"{key} = :{key}")
-				params[key] = value
-		query = "SELECT * FROM contracts"
-		if query_conditions:
-			query += " WHERE " + " AND ".join(query_conditions)
-		query += " LIMIT 1"
+	def pool_stats(self) -> PoolStats:
+		return self.pool.stats()
 
+	async def find_table_scans(self) -> dict[str, list[str]]:
 		async with self.connect() as db:
-			async with db.execute(query, params) as cursor:
-				row = await cursor.fetchone()
-				if row:
-					return _construct_contract(row)
-				return None
-
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
-	async def fetch_users(self, limit: int = None, **kwargs) -> list[User]:
-		query_conditions = []
-		params = {}
-		param_counter = 0
-		for key, value in kwargs.items():
-			if isinstance(value, tuple):
-				placeholders = []
-				for v in value:
-					param_key = f"{key}_{param_counter}"
-					param_counter += 1
-					placeholders.append(f":{param_key}")
-					params[param_key] = v.value if isinstance(v, Enum) else v
-				query_conditions.append(f"{key} IN ({', '.join(placeholders)})")
-			else:
-				if isinstance(value, Enum):
-					value = value.value
-				query_conditions.append(f"{key} = :{key}")
-				params[key] = value
-		query = "SELECT * FROM users"
-		if query_conditions:
-			query += " WHERE " + " AND ".join(query_conditions)
-		if limit is not None:
-			query += f" LIMIT {limit}"
+			return await schema.find_table_scans(db)
 
-		async with self.connect() as db:
-			async with db.execute(query, params) as cursor:
-				rows = await cursor.fetchall()
-				return [_construct_user(row) for row in rows]
-
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
-	async def fetch_contracts(self, limit: int = None, **kwargs) -> list[Contract]:
-		query_conditions = []
-		params = {}
-		param_counter = 0
-		for key, value in kwargs.items():
-			if isinstance(value, tuple):
-				placeholders = []
-				for v in value:
-					param_key = f"{key}_{param_counter}"
-					param_counter += 1
-					placeholders.append(f":{param_key}")
-					params[param_key] = v.value if isinstance(v, Enum) else v
-				query_conditions.append(f"{key} IN ({', '.join(placeholders)})")
-			else:
-				if isinstance(value, Enum):
-					value = value.value
-				query_conditions.append(f"{key} = :{key}")
-				params[key] = value
-		query = "SELECT * FROM contracts"
-		if query_conditions:
-			query += " WHERE " + " AND ".join(query_conditions)
-		if limit is not None:
-			query += f" LIMIT {limit}"
+	@asynccontextmanager
+	async def write_session(self):
+		async with self.connect(write=True) as db:
+			async with db.execute(
+				"SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'contracts'), 0), COALESCE((SELECT MAX(id) FROM contracts), 0))"
+			) as cursor:
+				last_contract_id = (await cursor.fetchone())[0]
+
+			session = SeasonWriteSession(last_contract_id + 1)
+			yield session
+
+			try:
+				await session.apply(db)
+				await db.commit()
+			except BaseException:  # Cancellation included, or the writer would be left holding a half applied transaction
+				await db.rollback()
+				raise
+
+	async def create_user(self, username: str, status: UserStatus, **kwargs):
+		async with self.write_session() as session:
+			session.create_user(username, status, **kwargs)
+
+	async def create_contract(self, name: str, type: ContractType, kind: ContractKind, status: ContractStatus, contractee: str, **kwargs) -> int:
+		async with self.write_session() as session:
+			return session.create_contract(name, type, kind, status, contractee, **kwargs)
+
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _fetch_user(self, version: int, fields: tuple[str, ...] | None, **kwargs) -> User | None:
+		rows = await self._select("users", kwargs, fields, 1)
+		return rows[0] if rows else None
 
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _fetch_contract(self, version: int, fields: tuple[str, ...] | None, **kwargs) -> Contract | None:
+		rows = await self._select("contracts", kwargs, fields, 1)
+		return rows[0] if rows else None
+
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _fetch_users(self, version: int, fields: tuple[str, ...] | None, limit: int = None, **kwargs) -> list[User]:
+		return await self._select("users", kwargs, fields, limit)
+
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _fetch_contracts(self, version: int, fields: tuple[str, ...] | None, limit: int = None, **kwargs) -> list[Contract]:
+		return await self._select("contracts", kwargs, fields, limit)
+
+	async def _select(self, table: str, filters: dict, fields: tuple[str, ...] | None, limit: int | None) -> list:
+		query, params = select_query(table, filters, projection=fields, limit=limit)
 		async with self.connect() as db:
 			async with db.execute(query, params) as cursor:
 				rows = await cursor.fetchall()
-				return [_construct_contract(row) for row in rows]
 
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
-	async def count_users(self, **kwargs) -> int:
-		query_conditions = []
-		params = {}
-		param_counter = 0
-		for key, value in kwargs.items():
-			if isinstance(value, tuple):
-				placeholders = []
-				for v in value:
-					param_key = f"{key}_{param_counter}"
-					param_counter += 1
-					placeholders.append(f":{param_key}")
-					params[param_key] = v.value if isinstance(v, Enum) else v
-				query_conditions.append(f"{key} IN ({', '.join(placeholders)})")
-			else:
-				if isinstance(value, Enum):
-					value = value.value
-				query_conditions.append(f"{key} = :{key}")
-				params[key] = value
-		query = "SELECT COUNT(*) FROM users"
-		if query_conditions:
-			query += " WHERE " + " AND ".join(query_conditions)
+		if fields is not None:
+			record = _record_type(table, fields)
+			return [record(row) for row in rows]
+		construct = _construct_user if table == "users" else _construct_contract
+		return [construct(row) for row in rows]
 
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _count_users(self, version: int, **kwargs) -> int:
+		query, params = count_query("users", kwargs)
 		async with self.connect() as db:
 			async with db.execute(query, params) as cursor:
 				row = await cursor.fetchone()
 				return row[0]
 
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
-	async def count_contracts(self, **kwargs) -> int:
-		query_conditions = []
-		params = {}
-		param_counter = 0
-		for key, value in kwargs.items():
-			if isinstance(value, tuple):
-				placeholders = []
-				for v in value:
-					param_key = f"{key}_{param_counter}"
-					param_counter += 1
-					placeholders.append(f":{param_key}")
-					params[param_key] = v.value if isinstance(v, Enum) else v
-				query_conditions.append(f"{key} IN ({', '.join(placeholders)})")
-			else:
-				if isinstance(value, Enum):
-					value = value.value
-				query_conditions.append(f"{key} = :{key}")
-				params[key] = value
-		query = "SELECT COUNT(*) FROM contracts"
-		if query_conditions:
-			query += " WHERE " + " AND ".join(query_conditions)
-
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _count_contracts(self, version: int, **kwargs) -> int:
+		query, params = count_query("contracts", kwargs)
 		async with self.connect() as db:
 			async with db.execute(query, params) as cursor:
 				row = await cursor.fetchone()
 				return row[0]
 
-	async def update_user(self, username: str, **kwargs):
-		for key, value in kwargs.items():
-			if isinstance(value, Enum):
-				kwargs[key] = value.value
-		query_set = ", ".join(f"{key} = :{key}" for key in kwargs)
-		query = f"UPDATE users SET {query_set} WHERE username = :username"
+	async def _read_stats(self, scope: str) -> SeasonStats:
+		async with self.connect() as db:
+			async with db.execute(
+				"SELECT kind, type, status, count FROM season_stats WHERE scope = ? AND count != 0 ORDER BY first_id", (scope,)
+			) as cursor:
+				return _construct_stored_stats(await cursor.fetchall())
+
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _fetch_stats(self, version: int, scope: str) -> SeasonStats:
+		return await self._read_stats(scope)
 
+	async def recount_stats(self, rep: str | None = None) -> SeasonStats:  # Counts straight from users/contracts, bypassing season_stats
 		async with self.connect() as db:
-			await db.execute(query, {"username": username, **kwargs})
-			await db.commit()
+			if not rep:
+				user_query = "SELECT status, COUNT(*) FROM users GROUP BY status"
+				contract_query = "SELECT kind, type, status, COUNT(*) FROM contracts GROUP BY kind, type, status ORDER BY MIN(id)"
+				params = ()
+			else:
+				user_query = "SELECT status, COUNT(*) FROM users WHERE rep = ? GROUP BY status"
+				contract_query = (
+					"SELECT c.kind, c.type, c.status, COUNT(*) FROM users u JOIN contracts c ON c.contractee = u.username "
+					"WHERE u.rep = ? GROUP BY c.kind, c.type, c.status ORDER BY MIN(c.id)"
+				)
+				params = (rep,)
 
-	async def update_contract(self, id: int, **kwargs):
-		for key, value in kwargs.items():
-			if isinstance(value, Enum):
-				kwargs[key] = value.value
-		query_set = ", ".join(f"{key} = :{key}" for key in kwargs)
-		query = f"UPDATE contracts SET {query_set} WHERE id = :id"
+			async with db.execute(user_query, params) as cursor:
+				user_counts = await cursor.fetchall()
+			async with db.execute(contract_query, params) as cursor:
+				contract_counts = await cursor.fetchall()
+
+		return _construct_stats(user_counts, contract_counts)
 
+	async def verify_stats(self) -> list[str]:  # Returns the scopes where season_stats disagrees with a full recount
 		async with self.connect() as db:
-			await db.execute(query, {"id": id, **kwargs})
+			async with db.execute("SELECT DISTINCT rep FROM users WHERE coalesce(rep, '') != ''") as cursor:
+				reps = [row[0] for row in await cursor.fetchall()]
+			async with db.execute("SELECT DISTINCT scope FROM season_stats WHERE count != 0") as cursor:
+				scopes = {row[0] for row in await cursor.fetchall()}
+
+		mismatched = []
+		for scope in dict.fromkeys(["", *reps, *sorted(scopes)]):
+			stored = await self._read_stats(scope)
+			counted = await self.recount_stats(scope)
+			if (stored.users, stored.contracts, stored.aids) != (counted.users, counted.contracts, counted.aids):
+				mismatched.append(scope)
+
+		return mismatched
+
+	async def rebuild_stats(self):
+		async with self.connect(write=True) as db:
+			for query in STATS_REBUILD_QUERIES:
+				await db.execute(query)
 			await db.commit()
+		await self.mark_synced()
+
+	# fields= limits the columns read and returns lightweight records with just those attributes.
+	# From the snapshot the full rows are already in memory, so those are returned as they are.
+	async def fetch_user(self, fields: tuple[str, ...] | None = None, **kwargs) -> User | None:
+		if self.snapshot is not None:
+			users = self.snapshot.fetch_users(kwargs, limit=1, fields=fields)
+			return users[0] if users else None
+		return await self._fetch_user(self.version, fields, **kwargs)
+
+	async def fetch_contract(self, fields: tuple[str, ...] | None = None, **kwargs) -> Contract | None:
+		if self.snapshot is not None:
+			contracts = self.snapshot.fetch_contracts(kwargs, limit=1, fields=fields)
+			return contracts[0] if contracts else None
+		return await self._fetch_contract(self.version, fields, **kwargs)
+
+	async def fetch_users(self, limit: int = None, fields: tuple[str, ...] | None = None, **kwargs) -> list[User]:
+		if self.snapshot is not None:
+			return self.snapshot.fetch_users(kwargs, limit, fields=fields)
+		return await self._fetch_users(self.version, fields, limit, **kwargs)
+
+	async def fetch_contracts(self, limit: int = None, fields: tuple[str, ...] | None = None, **kwargs) -> list[Contract]:
+		if self.snapshot is not None:
+			return self.snapshot.fetch_contracts(kwargs, limit, fields=fields)
+		return await self._fetch_contracts(self.version, fields, limit, **kwargs)
+
+	async def count_users(self, **kwargs) -> int:
+		if self.snapshot is not None:
+			return self.snapshot.count_users(kwargs)
+		return await self._count_users(self.version, **kwargs)
+
+	async def count_contracts(self, **kwargs) -> int:
+		if self.snapshot is not None:
+			return self.snapshot.count_contracts(kwargs)
+		return await self._count_contracts(self.version, **kwargs)
+
+	async def update_user(self, username: str, **kwargs):
+		async with self.write_session() as session:
+			session.update_user(username, **kwargs)
+
+	async def update_contract(self, id: int, **kwargs):
+		async with self.write_session() as session:
+			session.update_contract(id, **kwargs)
+
+	async def fetch_stats(self, rep: str | None = None) -> SeasonStats:  # Whole season, or only the users of a rep
+		if self.snapshot is not None:
+			return self.snapshot.stats.get(rep or "") or SeasonStats()
+		return await self._fetch_stats(self.version, rep or "")
 
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
 	async def has_user(self, username: str) -> bool:
-		async with self.connect() as db:
-			async with db.execute("SELECT 1 FROM users WHERE username = :username", {"username": username}) as cursor:
-				return await cursor.fetchone() is not None
+		if self.snapshot is not None:
+			return username in self.snapshot.users
+		return await self._has_user(self.version, username)
 
-	@alru_cache(ttl=CACHE_DURATION_MINUTES * 60)
 	async def has_contract(self, id: int) -> bool:
-		async with self.connect() as db:
-			async with db.execute("SELECT 1 FROM contracts WHERE id = :id", {"id": id}) as cursor:
-				return await cursor.fetchone() is not None
+		if self.snapshot is not None:
+			return id in self.snapshot.contracts
+		return await self._has_contract(self.version, id)
+
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _has_user(self, version: int, username: str) -> bool:
+		async with self.connect() as db, db.execute("SELECT 1 FROM users WHERE username = :username", {"username": username}) as cursor:
+			return await cursor.fetchone() is not None
+
+	@alru_cache(maxsize=CACHE_MAXSIZE)
+	async def _has_contract(self, version: int, id: int) -> bool:
+		async with self.connect() as db, db.execute("SELECT 1 FROM contracts WHERE id = :id", {"id": id}) as cursor:
+			return await cursor.fetchone() is not None
 
 
 class SeasonSyncContext:
 	def __init__(self):
 		self.users: dict[str, User] = {}
 		self.contracts: dict[str, dict[ContractType, Contract]] = {}
+		self.discord_ids: dict[str, int] = {}  # Resolved from madfigs for new users and users still missing one
+		self.row_hashes: dict[tuple[str, str], bytes] = {}  # (tab, key) -> hash as of the last sync
+		self.tab_reports: dict[str, TabReport] = {}
 
 	async def load(self, db: SeasonDB):
-		db.fetch_users.cache_clear()
-		db.fetch_contracts.cache_clear()
-		self.users = {u.username: u for u in await db.fetch_users()}
+		async with db.connect() as connection:
+			await self.load_from(connection)
+
+	async def load_from(self, connection: aiosqlite.Connection):  # Any connection to the season's database, e.g. from a worker process
+		users, contracts = await SeasonDB._read_all(connection)
+		self.users = {u.username: u for u in users}
 		self.contracts = {}
-		for contract in await db.fetch_contracts():
+		for contract in contracts:
 			self.contracts.setdefault(contract.contractee, {})[contract.type] = contract
+
+		async with connection.execute("SELECT tab, key, hash FROM sheet_row_hashes") as cursor:
+			self.row_hashes = {(tab, key): hash for tab, key, hash in await cursor.fetchall()}
+
+	# Returns the rows to parse (in sheet order) and the keys whose rows changed, recording their new hashes in the session.
+	# Rows are hashed per key, so all rows of a user in a tab are parsed together or not at all, and keys in always are parsed regardless.
+	# Unless the tab creates users itself, rows of users that don't exist yet are parsed without recording a hash:
+	# the parser skips them, so they have to be looked at again once the user exists.
+	# fingerprint identifies the parser, so rows last parsed by a different one count as changed.
+	def changed_rows(
+		self,
+		session: SeasonWriteSession,
+		tab: str,
+		rows: list[list[str]],
+		key: Callable[[list[str]], str],
+		always: set[str] = frozenset(),
+		creates_users: bool = False,
+		fingerprint: bytes = b"",
+	) -> tuple[list[list[str]], set[str]]:
+		groups: dict[str, list[list[str]]] = {}
+		for row in rows:
+			groups.setdefault(key(row), []).append(row)
+
+		changed: set[str] = set()
+		pending: set[str] = set()
+		for group_key, group in groups.items():
+			if not creates_users and group_key not in self.users:
+				pending.add(group_key)
+				continue
+
+			digest = hash_rows(group, fingerprint)
+			if self.row_hashes.get((tab, group_key)) != digest:
+				changed.add(group_key)
+				session.set_row_hash(tab, group_key, digest)
+
+		parse = changed | pending | (always & groups.keys())
+		parsed_rows = [row for row in rows if key(row) in parse]
+		self.tab_reports[tab] = TabReport(changed=len(parsed_rows), skipped=len(rows) - len(parsed_rows))
+		return parsed_rows, changed
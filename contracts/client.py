@@ -0,0 +1,109 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable
+import itertools
+import asyncio
+import aiohttp
+import random
+import time
+
+__all__ = ["HttpClient", "HttpStats", "RETRY_STATUSES"]
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(slots=True)
+class HttpStats:
+	requests: int = 0  # Attempts, retries included
+	retries: int = 0
+	failures: int = 0  # Requests that were still failing once out of retries
+	latency_total: float = 0.0  # Until the response headers arrived
+	latency_max: float = 0.0
+
+	@property
+	def latency_avg(self) -> float:
+		return self.latency_total / self.requests if self.requests else 0.0
+
+
+class HttpClient:  # One keep-alive session for the bot's lifetime, with timeouts and bounded retries on every request
+	def __init__(
+		self, timeout: float = 60.0, connect_timeout: float = 10.0, retries: int = 3, backoff: float = 0.5, backoff_max: float = 10.0, limit: int = 10
+	):
+		self.timeout = timeout
+		self.connect_timeout = connect_timeout
+		self.retries = retries  # Extra attempts after the first one
+		self.backoff = backoff
+		self.backoff_max = backoff_max
+		self.limit = limit
+		self.stats = HttpStats()
+		self._session: aiohttp.ClientSession | None = None
+
+	@property
+	def session(self) -> aiohttp.ClientSession:  # Created on first use since it has to be made inside the event loop
+		if self._session is None or self._session.closed:
+			connector = aiohttp.TCPConnector(limit=self.limit, ttl_dns_cache=300, keepalive_timeout=60)
+			self._session = aiohttp.ClientSession(connector=connector, headers={"Accept-Encoding": "gzip, deflate"})
+		return self._session
+
+	async def close(self):
+		if self._session is not None:
+			await self._session.close()
+			self._session = None
+
+	def _delay(self, attempt: int, response: aiohttp.ClientResponse | None) -> float:
+		if response is not None and (retry_after := response.headers.get("Retry-After", "")).isdigit():
+			return min(float(retry_after), self.backoff_max)
+		return random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))  # Full jitter, so retries from a shared outage spread out
+
+	async def _send(self, method: str, url: str, timeout: float | None, read: Callable[[aiohttp.ClientResponse], Awaitable[Any]] | None, **kwargs):
+		client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout, sock_connect=self.connect_timeout)
+		for attempt in itertools.count():
+			response = None
+			self.stats.requests += 1
+			start = time.perf_counter()
+			try:
+				response = await self.session.request(method, url, timeout=client_timeout, **kwargs)
+				latency = time.perf_counter() - start
+				self.stats.latency_total += latency
+				self.stats.latency_max = max(self.stats.latency_max, latency)
+
+				if response.status not in RETRY_STATUSES or attempt >= self.retries:
+					if response.status in RETRY_STATUSES:
+						self.stats.failures += 1
+					if read is None:
+						return response
+					async with response:
+						return await read(response)
+				response.release()
+			except aiohttp.ClientResponseError:
+				raise  # Raised by read for a status that isn't worth retrying, or one that already was
+			except (aiohttp.ClientError, TimeoutError):
+				if attempt >= self.retries:
+					self.stats.failures += 1
+					raise
+
+			self.stats.retries += 1
+			await asyncio.sleep(self._delay(attempt, response))
+
+	# Only the request is retried, not the body, so streamed responses are never read twice
+	@asynccontextmanager
+	async def request(self, method: str, url: str, *, timeout: float | None = None, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+		response = await self._send(method, url, timeout, None, **kwargs)
+		try:
+			yield response
+		finally:
+			response.release()
+
+	async def get_json(self, url: str, *, timeout: float | None = None, **kwargs) -> Any:  # Also retries bodies that fail mid-download
+		async def read(response: aiohttp.ClientResponse) -> Any:
+			response.raise_for_status()
+			return await response.json()
+
+		return await self._send("GET", url, timeout, read, **kwargs)
+
+	async def get_bytes(self, url: str, *, timeout: float | None = None, **kwargs) -> bytes:  # Decompressed, but otherwise as sent
+		async def read(response: aiohttp.ClientResponse) -> bytes:
+			response.raise_for_status()
+			return await response.read()
+
+		return await self._send("GET", url, timeout, read, **kwargs)
@@ -0,0 +1,176 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable
+from .classes import SeasonSyncContext, UserStatus, ContractType, ContractKind, ContractStatus
+from .sync import Change, CreateUser, UpdateUser, CreateContract, UpdateContract
+import asyncio
+
+__all__ = [
+	"SyncEvent",
+	"UserCreated",
+	"UserStatusChanged",
+	"UserUpdated",
+	"ContractCreated",
+	"AidAdded",
+	"ContractStatusChanged",
+	"ContractProgressChanged",
+	"ContractUpdated",
+	"SyncCompleted",
+	"EventBus",
+	"sync_events",
+]
+
+
+@dataclass(slots=True, frozen=True)
+class SyncEvent:
+	season: str
+
+
+@dataclass(slots=True, frozen=True)
+class UserCreated(SyncEvent):
+	username: str
+	status: UserStatus
+
+
+@dataclass(slots=True, frozen=True)
+class UserStatusChanged(SyncEvent):
+	username: str
+	old: UserStatus
+	new: UserStatus
+
+
+@dataclass(slots=True, frozen=True)
+class UserUpdated(SyncEvent):  # Any other field, with only the new values
+	username: str
+	fields: dict
+
+
+@dataclass(slots=True, frozen=True)
+class ContractCreated(SyncEvent):
+	id: int
+	contractee: str
+	type: ContractType
+	name: str
+	status: ContractStatus
+
+
+@dataclass(slots=True, frozen=True)
+class AidAdded(ContractCreated):
+	pass
+
+
+@dataclass(slots=True, frozen=True)
+class ContractStatusChanged(SyncEvent):
+	id: int
+	contractee: str
+	type: ContractType
+	old: ContractStatus
+	new: ContractStatus
+
+
+@dataclass(slots=True, frozen=True)
+class ContractProgressChanged(SyncEvent):
+	id: int
+	contractee: str
+	type: ContractType
+	old: str | None  # None for a contract created earlier in the same sync
+	new: str
+
+
+@dataclass(slots=True, frozen=True)
+class ContractUpdated(SyncEvent):  # Any other field, with only the new values
+	id: int
+	contractee: str
+	type: ContractType
+	fields: dict
+
+
+@dataclass(slots=True, frozen=True)
+class SyncCompleted(SyncEvent):  # Published after the rest of a sync's events, once its writes are visible to readers
+	revision: str | None
+	changed: int
+
+
+# ctx has to be the one the changes were parsed against, so it still holds what every user and contract looked like before the sync
+def sync_events(season: str, changes: Iterable[Change], ctx: SeasonSyncContext) -> list[SyncEvent]:
+	user_statuses = {username: user.status for username, user in ctx.users.items()}
+	contracts = {contract.id: contract for user_contracts in ctx.contracts.values() for contract in user_contracts.values()}
+	states: dict[int, dict] = {}  # Contracts touched so far, as of the last change seen
+
+	events: list[SyncEvent] = []
+	for change in changes:
+		match change:
+			case CreateUser(username, values):
+				user_statuses[username] = values["status"]
+				events.append(UserCreated(season, username, values["status"]))
+			case UpdateUser(username, values):
+				fields = dict(values)
+				if "status" in fields:
+					status = fields.pop("status")
+					if status != user_statuses.get(username):
+						events.append(UserStatusChanged(season, username, user_statuses.get(username), status))
+						user_statuses[username] = status
+				if fields:
+					events.append(UserUpdated(season, username, fields))
+			case CreateContract(id, values):
+				states[id] = dict(values)
+				event = AidAdded if values["kind"] == ContractKind.AID else ContractCreated
+				events.append(event(season, id, values["contractee"], values["type"], values["name"], values["status"]))
+			case UpdateContract(id, values):
+				if (state := states.get(id)) is None:
+					if (contract := contracts.get(id)) is None:
+						continue
+					state = states[id] = {
+						"contractee": contract.contractee,
+						"type": contract.type,
+						"status": contract.status,
+						"progress": contract.progress,
+					}
+
+				contractee, type = state["contractee"], state["type"]
+				fields = {}
+				for name, value in values.items():
+					old = state.get(name)
+					if name == "status" and value != old:
+						events.append(ContractStatusChanged(season, id, contractee, type, old, value))
+					elif name == "progress" and value != old:
+						events.append(ContractProgressChanged(season, id, contractee, type, old, value))
+					elif name not in ("status", "progress"):
+						fields[name] = value
+				if fields:
+					events.append(ContractUpdated(season, id, contractee, type, fields))
+				state.update(values)
+
+	return events
+
+
+class EventBus:  # In-process pub/sub for sync events, keeping the most recent ones around for anything that starts late
+	def __init__(self, history: int = 1000, queue_size: int = 10000):
+		self.recent: deque[SyncEvent] = deque(maxlen=history)
+		self.queue_size = queue_size
+		self.dropped = 0  # Events a slow subscriber never got, since publishing never waits on subscribers
+		self._subscribers: dict[asyncio.Queue[SyncEvent], tuple[type[SyncEvent], ...]] = {}
+
+	def publish(self, events: Iterable[SyncEvent]):
+		for event in events:
+			self.recent.append(event)
+			for queue, types in self._subscribers.items():
+				if not isinstance(event, types):
+					continue
+				if queue.full():
+					queue.get_nowait()
+					self.dropped += 1
+				queue.put_nowait(event)
+
+	def subscribe(self, *types: type[SyncEvent]) -> AsyncIterator[SyncEvent]:  # Every event published from now on, or only these types
+		# Registered right away rather than on the first iteration, so nothing published while the subscriber gets ready is missed
+		queue: asyncio.Queue[SyncEvent] = asyncio.Queue(self.queue_size)
+		self._subscribers[queue] = types or (SyncEvent,)
+		return self._receive(queue)
+
+	async def _receive(self, queue: asyncio.Queue[SyncEvent]) -> AsyncIterator[SyncEvent]:
+		try:
+			while True:
+				yield await queue.get()
+		finally:
+			del self._subscribers[queue]
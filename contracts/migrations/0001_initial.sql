@@ -1,5 +1,3 @@
-PRAGMA journal_mode=WAL;
-
 CREATE TABLE IF NOT EXISTS users (
 	username TEXT PRIMARY KEY NOT NULL UNIQUE,
 	status INTEGER NOT NULL,
@@ -0,0 +1,11 @@
+-- /get: contracts WHERE contractee = ? AND kind = ?, also covers the per-user status counts
+CREATE INDEX IF NOT EXISTS contracts_contractee_kind ON contracts (contractee, kind, status);
+
+-- /stats: season-wide contract counts by kind, status and type
+CREATE INDEX IF NOT EXISTS contracts_kind_status ON contracts (kind, status, type);
+
+-- /profile and [contractee]: users WHERE contractor = ?
+CREATE INDEX IF NOT EXISTS users_contractor ON users (contractor);
+
+-- /stats rep:X and rep autocomplete: users WHERE rep = ?, DISTINCT rep
+CREATE INDEX IF NOT EXISTS users_rep_status ON users (rep, status);
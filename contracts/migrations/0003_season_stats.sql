@@ -0,0 +1,108 @@
+-- Materialized /stats counts, kept up to date by triggers from the rows each sync actually changes.
+-- scope is '' for the whole season, otherwise a rep. kind is -1 and type is '' for user rows.
+-- first_id is the lowest contract id seen in a group, used to list contract types in sheet order.
+CREATE TABLE IF NOT EXISTS season_stats (
+	scope TEXT NOT NULL,
+	kind INTEGER NOT NULL,
+	type TEXT NOT NULL,
+	status INTEGER NOT NULL,
+	count INTEGER NOT NULL,
+	first_id INTEGER,
+	PRIMARY KEY (scope, kind, type, status)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS season_stats_user_insert AFTER INSERT ON users
+BEGIN
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT scope, -1, '', NEW.status, 1 FROM (SELECT '' AS scope UNION ALL SELECT NEW.rep WHERE coalesce(NEW.rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+
+	-- Contracts can be created before their contractee, those are only counted season-wide until now
+	INSERT INTO season_stats (scope, kind, type, status, count, first_id)
+	SELECT NEW.rep, kind, type, status, COUNT(*), MIN(id) FROM contracts WHERE contractee = NEW.username AND coalesce(NEW.rep, '') != ''
+	GROUP BY kind, type, status
+	ON CONFLICT DO UPDATE SET count = count + excluded.count, first_id = coalesce(min(first_id, excluded.first_id), first_id, excluded.first_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS season_stats_user_delete AFTER DELETE ON users
+BEGIN
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT scope, -1, '', OLD.status, -1 FROM (SELECT '' AS scope UNION ALL SELECT OLD.rep WHERE coalesce(OLD.rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT OLD.rep, kind, type, status, -COUNT(*) FROM contracts WHERE contractee = OLD.username AND coalesce(OLD.rep, '') != ''
+	GROUP BY kind, type, status
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS season_stats_user_update AFTER UPDATE OF status, rep ON users
+WHEN OLD.status IS NOT NEW.status OR OLD.rep IS NOT NEW.rep
+BEGIN
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT scope, -1, '', OLD.status, -1 FROM (SELECT '' AS scope UNION ALL SELECT OLD.rep WHERE coalesce(OLD.rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT scope, -1, '', NEW.status, 1 FROM (SELECT '' AS scope UNION ALL SELECT NEW.rep WHERE coalesce(NEW.rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+
+	-- Moving to another rep takes the user's contracts along
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT OLD.rep, kind, type, status, -COUNT(*) FROM contracts
+	WHERE contractee = NEW.username AND OLD.rep IS NOT NEW.rep AND coalesce(OLD.rep, '') != ''
+	GROUP BY kind, type, status
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+
+	INSERT INTO season_stats (scope, kind, type, status, count, first_id)
+	SELECT NEW.rep, kind, type, status, COUNT(*), MIN(id) FROM contracts
+	WHERE contractee = NEW.username AND OLD.rep IS NOT NEW.rep AND coalesce(NEW.rep, '') != ''
+	GROUP BY kind, type, status
+	ON CONFLICT DO UPDATE SET count = count + excluded.count, first_id = coalesce(min(first_id, excluded.first_id), first_id, excluded.first_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS season_stats_contract_insert AFTER INSERT ON contracts
+BEGIN
+	INSERT INTO season_stats (scope, kind, type, status, count, first_id)
+	SELECT scope, NEW.kind, NEW.type, NEW.status, 1, NEW.id
+	FROM (SELECT '' AS scope UNION ALL SELECT rep FROM users WHERE username = NEW.contractee AND coalesce(rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count, first_id = coalesce(min(first_id, excluded.first_id), first_id, excluded.first_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS season_stats_contract_delete AFTER DELETE ON contracts
+BEGIN
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT scope, OLD.kind, OLD.type, OLD.status, -1
+	FROM (SELECT '' AS scope UNION ALL SELECT rep FROM users WHERE username = OLD.contractee AND coalesce(rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS season_stats_contract_update AFTER UPDATE OF kind, type, status, contractee ON contracts
+WHEN OLD.kind IS NOT NEW.kind OR OLD.type IS NOT NEW.type OR OLD.status IS NOT NEW.status OR OLD.contractee IS NOT NEW.contractee
+BEGIN
+	INSERT INTO season_stats (scope, kind, type, status, count)
+	SELECT scope, OLD.kind, OLD.type, OLD.status, -1
+	FROM (SELECT '' AS scope UNION ALL SELECT rep FROM users WHERE username = OLD.contractee AND coalesce(rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count;
+
+	INSERT INTO season_stats (scope, kind, type, status, count, first_id)
+	SELECT scope, NEW.kind, NEW.type, NEW.status, 1, NEW.id
+	FROM (SELECT '' AS scope UNION ALL SELECT rep FROM users WHERE username = NEW.contractee AND coalesce(rep, '') != '') WHERE true
+	ON CONFLICT DO UPDATE SET count = count + excluded.count, first_id = coalesce(min(first_id, excluded.first_id), first_id, excluded.first_id);
+END;
+
+-- Backfill from the rows already in the season
+DELETE FROM season_stats;
+
+INSERT INTO season_stats (scope, kind, type, status, count)
+SELECT '', -1, '', status, COUNT(*) FROM users GROUP BY status;
+
+INSERT INTO season_stats (scope, kind, type, status, count)
+SELECT rep, -1, '', status, COUNT(*) FROM users WHERE coalesce(rep, '') != '' GROUP BY rep, status;
+
+INSERT INTO season_stats (scope, kind, type, status, count, first_id)
+SELECT '', kind, type, status, COUNT(*), MIN(id) FROM contracts GROUP BY kind, type, status;
+
+INSERT INTO season_stats (scope, kind, type, status, count, first_id)
+SELECT u.rep, c.kind, c.type, c.status, COUNT(*), MIN(c.id) FROM contracts c JOIN users u ON u.username = c.contractee
+WHERE coalesce(u.rep, '') != '' GROUP BY u.rep, c.kind, c.type, c.status;
@@ -0,0 +1,8 @@
+-- Content hash of every sheet row group synced so far, so unchanged rows can be skipped on the next sync.
+-- key is the username a group of rows belongs to within its tab.
+CREATE TABLE IF NOT EXISTS sheet_row_hashes (
+	tab TEXT NOT NULL,
+	key TEXT NOT NULL,
+	hash BLOB NOT NULL,
+	PRIMARY KEY (tab, key)
+) WITHOUT ROWID;
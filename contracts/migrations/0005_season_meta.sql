@@ -0,0 +1,5 @@
+-- Small key/value store for sync bookkeeping, such as the spreadsheet revision the season was last synced from.
+CREATE TABLE IF NOT EXISTS season_meta (
+	key TEXT PRIMARY KEY,
+	value TEXT
+) WITHOUT ROWID;
@@ -0,0 +1,153 @@
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from urllib.request import pathname2url
+import asyncio
+import os
+import time
+import aiosqlite
+
+__all__ = ["ConnectionPool", "PoolStats", "READER_PRAGMAS", "WRITER_PRAGMAS"]
+
+# Readers only ever run lookups, so they get a bigger page cache and memory-mapped reads
+READER_PRAGMAS = ("PRAGMA query_only = ON", "PRAGMA mmap_size = 268435456", "PRAGMA cache_size = -8192", "PRAGMA temp_store = MEMORY")
+# WAL with synchronous=NORMAL only fsyncs on checkpoints, which SeasonDB batches after each sync instead of every 1000 pages
+WRITER_PRAGMAS = ("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL", "PRAGMA wal_autocheckpoint = 10000", "PRAGMA temp_store = MEMORY")
+
+
+@dataclass(slots=True)
+class PoolStats:
+	readers: int
+	readers_in_use: int = 0
+	readers_peak: int = 0
+	reader_acquisitions: int = 0
+	reader_wait_total: float = 0.0
+	reader_wait_max: float = 0.0
+	writer_in_use: bool = False
+	writer_acquisitions: int = 0
+	writer_wait_total: float = 0.0
+	writer_wait_max: float = 0.0
+
+	@property
+	def utilisation(self) -> float:
+		return self.readers_in_use / self.readers if self.readers else 0.0
+
+	@property
+	def reader_wait_avg(self) -> float:
+		return self.reader_wait_total / self.reader_acquisitions if self.reader_acquisitions else 0.0
+
+	@property
+	def writer_wait_avg(self) -> float:
+		return self.writer_wait_total / self.writer_acquisitions if self.writer_acquisitions else 0.0
+
+
+class ConnectionPool:  # Long-lived readers plus a single writer, opened once per database file
+	def __init__(
+		self,
+		path: str,
+		readers: int = 4,
+		reader_pragmas: tuple[str, ...] = READER_PRAGMAS,
+		writer_pragmas: tuple[str, ...] = WRITER_PRAGMAS,
+		immutable: bool = False,
+	):
+		self.path = path
+		self.size = readers
+		self.immutable = immutable  # Readers only, opened without locking or a WAL since the file can never change
+		self.reader_pragmas = reader_pragmas
+		self.writer_pragmas = writer_pragmas
+		self._readers: asyncio.Queue[aiosqlite.Connection] | None = None
+		self._all_readers: list[aiosqlite.Connection] = []
+		self._writer: aiosqlite.Connection | None = None
+		self._writer_lock = asyncio.Lock()
+		self._stats = PoolStats(readers=readers)
+
+	@property
+	def is_open(self) -> bool:
+		return self._writer is not None or (self.immutable and self._readers is not None)
+
+	async def _connect(self, pragmas: tuple[str, ...]) -> aiosqlite.Connection:
+		if self.immutable:
+			connection = await aiosqlite.connect(f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro&immutable=1", uri=True)
+		else:
+			connection = await aiosqlite.connect(self.path)
+		for pragma in pragmas:
+			await connection.execute(pragma)
+		return connection
+
+	async def open_writer(self):
+		if self.immutable:
+			raise RuntimeError(f"{self.path} is immutable and has no writer")
+		if self._writer is None:
+			self._writer = await self._connect(self.writer_pragmas)
+
+	async def open_readers(self):
+		if self._readers is not None:
+			return
+
+		self._readers = asyncio.Queue()
+		for _ in range(self.size):
+			connection = await self._connect(self.reader_pragmas)
+			self._all_readers.append(connection)
+			self._readers.put_nowait(connection)
+
+	async def open(self):
+		await self.open_writer()
+		await self.open_readers()
+
+	async def close(self):
+		async with self._writer_lock:
+			# No new readers from here on, and the ones still checked out are waited for instead of closed under their queries
+			readers, self._readers = self._readers, None
+			if readers is not None:
+				for _ in self._all_readers:
+					await (await readers.get()).close()
+			self._all_readers.clear()
+
+			if self._writer is not None:
+				await self._writer.close()
+				self._writer = None
+
+	@asynccontextmanager
+	async def reader(self):
+		if self._readers is None:
+			raise RuntimeError(f"Connection pool for {self.path} is not open")
+
+		readers = self._readers  # Returned to this queue even if the pool starts closing meanwhile
+		start = time.perf_counter()
+		connection = await readers.get()
+		waited = time.perf_counter() - start
+
+		stats = self._stats
+		stats.reader_acquisitions += 1
+		stats.reader_wait_total += waited
+		stats.reader_wait_max = max(stats.reader_wait_max, waited)
+		stats.readers_in_use += 1
+		stats.readers_peak = max(stats.readers_peak, stats.readers_in_use)
+		try:
+			yield connection
+		finally:
+			stats.readers_in_use -= 1
+			readers.put_nowait(connection)
+
+	@asynccontextmanager
+	async def writer(self):
+		if self.immutable:
+			raise RuntimeError(f"{self.path} is immutable and has no writer")
+		if self._writer is None:
+			raise RuntimeError(f"Connection pool for {self.path} is not open")
+
+		start = time.perf_counter()
+		async with self._writer_lock:
+			waited = time.perf_counter() - start
+
+			stats = self._stats
+			stats.writer_acquisitions += 1
+			stats.writer_wait_total += waited
+			stats.writer_wait_max = max(stats.writer_wait_max, waited)
+			stats.writer_in_use = True
+			try:
+				yield self._writer
+			finally:
+				stats.writer_in_use = False
+
+	def stats(self) -> PoolStats:
+		return PoolStats(**{name: getattr(self._stats, name) for name in PoolStats.__slots__})
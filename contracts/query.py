@@ -0,0 +1,77 @@
+from functools import lru_cache
+from enum import Enum
+
+__all__ = ["TABLE_COLUMNS", "check_columns", "select_query", "count_query"]
+
+TABLE_COLUMNS: dict[str, tuple[str, ...]] = {
+	"users": (
+		"username",
+		"status",
+		"discord_id",
+		"rep",
+		"contractor",
+		"list_url",
+		"veto_used",
+		"accepting_manhwa",
+		"accepting_ln",
+		"preferences",
+		"bans",
+	),
+	"contracts": ("id", "name", "type", "kind", "status", "contractee", "optional", "contractor", "progress", "rating", "review_url", "medium"),
+}
+
+Shape = tuple[tuple[str, int], ...]  # (column, tuple arity or -1 for a plain value) per filter
+
+
+def check_columns(table: str, columns: tuple[str, ...]):
+	table_columns = TABLE_COLUMNS.get(table)
+	if table_columns is None:
+		raise ValueError(f"Unknown table: {table}")
+
+	for column in columns:
+		if column not in table_columns:
+			raise ValueError(f"Unknown column for {table}: {column}")
+
+
+@lru_cache(maxsize=512)
+def _compile(table: str, shape: Shape, projection: tuple[str, ...] | None, count: bool) -> str:
+	check_columns(table, tuple(column for column, _ in shape) + (projection or ()))
+
+	conditions = []
+	for column, arity in shape:
+		conditions.append(f"{column} = ?" if arity < 0 else f"{column} IN ({', '.join('?' * arity)})")
+
+	if count:
+		query = f"SELECT COUNT(*) FROM {table}"
+	else:
+		query = f"SELECT {', '.join(projection or TABLE_COLUMNS[table])} FROM {table}"
+	if conditions:
+		query += " WHERE " + " AND ".join(conditions)
+	if not count:
+		query += " ORDER BY rowid LIMIT ?"  # Always bound, so the query text doesn't change with the limit
+
+	return query
+
+
+def _shape(filters: dict) -> Shape:
+	return tuple((column, len(value) if isinstance(value, tuple) else -1) for column, value in filters.items())
+
+
+def _bind(filters: dict) -> list:
+	params = []
+	for value in filters.values():
+		if isinstance(value, tuple):
+			params.extend(v.value if isinstance(v, Enum) else v for v in value)
+		else:
+			params.append(value.value if isinstance(value, Enum) else value)
+	return params
+
+
+def select_query(table: str, filters: dict, projection: tuple[str, ...] | None = None, limit: int | None = None) -> tuple[str, list]:
+	params = _bind(filters)
+	params.append(limit if limit is not None else -1)
+	return _compile(table, _shape(filters), projection, False), params
+
+
+def count_query(table: str, filters: dict) -> tuple[str, list]:
+	return _compile(table, _shape(filters), None, True), _bind(filters)
@@ -0,0 +1,67 @@
+import os
+import re
+from .query import select_query, count_query
+import aiosqlite
+
+__all__ = ["MIGRATIONS", "HOT_QUERIES", "SCHEMA_VERSION", "migrate", "find_table_scans"]
+
+MIGRATIONS_PATH = "contracts/migrations"
+MIGRATIONS: list[tuple[int, str, str]] = []  # (version, name, script)
+
+for file_name in sorted(os.listdir(MIGRATIONS_PATH)):
+	if match := re.match(r"(\d+)_(.+)\.sql$", file_name):
+		with open(os.path.join(MIGRATIONS_PATH, file_name)) as f:
+			MIGRATIONS.append((int(match.group(1)), match.group(2), f.read()))
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Lookups on the command paths, checked with EXPLAIN QUERY PLAN so none of them silently regresses into a table scan
+HOT_QUERIES: dict[str, tuple[str, list]] = {
+	"/get contracts": select_query("contracts", {"contractee": "", "kind": 0}),
+	"/get aid count": count_query("contracts", {"contractee": ("", ""), "kind": 1, "status": 1}),
+	"/profile contractees": select_query("users", {"contractor": ""}),
+	"[contractee]": select_query("users", {"contractor": ""}, limit=1),
+	"/stats rep users": count_query("users", {"rep": "", "status": (0, 1)}),
+	"/stats rep list": select_query("users", {"rep": ""}),
+	"/stats": ("SELECT kind, type, status, count FROM season_stats WHERE scope = ? AND count != 0 ORDER BY first_id", [""]),
+	"/stats recount rep": (
+		"SELECT c.kind, c.type, c.status, COUNT(*) FROM users u JOIN contracts c ON c.contractee = u.username "
+		"WHERE u.rep = ? GROUP BY c.kind, c.type, c.status ORDER BY MIN(c.id)",
+		[""],
+	),
+}
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+	async with db.execute("PRAGMA user_version") as cursor:
+		return (await cursor.fetchone())[0]
+
+
+async def migrate(db: aiosqlite.Connection) -> list[int]:  # Returns the versions that were applied
+	current_version = await get_schema_version(db)
+	applied = []
+
+	for version, _, script in MIGRATIONS:
+		if version <= current_version:
+			continue
+
+		try:
+			await db.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+		except Exception:
+			await db.rollback()
+			raise
+		applied.append(version)
+
+	return applied
+
+
+async def find_table_scans(db: aiosqlite.Connection) -> dict[str, list[str]]:
+	scans: dict[str, list[str]] = {}
+	for name, (query, params) in HOT_QUERIES.items():
+		async with db.execute(f"EXPLAIN QUERY PLAN {query}", params) as cursor:
+			for row in await cursor.fetchall():
+				detail: str = row[3]
+				if detail.startswith("SCAN") and "COVERING INDEX" not in detail:
+					scans.setdefault(name, []).append(detail)
+
+	return scans
@@ -0,0 +1,99 @@
+from typing import TYPE_CHECKING, Iterable
+from enum import Enum
+from .query import check_columns
+
+if TYPE_CHECKING:
+	from .classes import User, Contract, SeasonStats
+
+__all__ = ["SeasonSnapshot"]
+
+
+def _wanted(value) -> frozenset:
+	values = value if isinstance(value, tuple) else (value,)
+	return frozenset(v.value if isinstance(v, Enum) else v for v in values if v is not None)
+
+
+def _filter(rows: Iterable, filters: dict, limit: int | None = None) -> list:
+	if not filters and limit is None:
+		return list(rows)
+
+	conditions = [(key, _wanted(value)) for key, value in filters.items()]
+	matches = []
+	for row in rows:
+		for key, wanted in conditions:
+			value = getattr(row, key)
+			if (value.value if isinstance(value, Enum) else value) not in wanted:
+				break
+		else:
+			matches.append(row)
+			if limit is not None and len(matches) >= limit:
+				break
+
+	return matches
+
+
+class SeasonSnapshot:  # Read-only copy of a whole season, swapped in as a unit after every sync
+	def __init__(self, users: list["User"], contracts: list["Contract"], stats: dict[str, "SeasonStats"]):
+		self.users: dict[str, "User"] = {user.username: user for user in users}
+		self.user_positions: dict[str, int] = {user.username: i for i, user in enumerate(users)}
+		self.contracts: dict[int, "Contract"] = {contract.id: contract for contract in contracts}
+
+		self.users_by_contractor: dict[str, list["User"]] = {}
+		self.users_by_rep: dict[str, list["User"]] = {}
+		for user in users:
+			self.users_by_contractor.setdefault(user.contractor, []).append(user)
+			self.users_by_rep.setdefault(user.rep, []).append(user)
+
+		self.contracts_by_contractee: dict[str, list["Contract"]] = {}
+		for contract in contracts:
+			self.contracts_by_contractee.setdefault(contract.contractee, []).append(contract)
+
+		self.stats = stats  # Scope ('' for the whole season, otherwise a rep) -> stats
+
+	@staticmethod
+	def _lookup(index: dict, value) -> list:
+		if isinstance(value, tuple):
+			return [row for key in dict.fromkeys(value) for row in index.get(key.value if isinstance(key, Enum) else key, ())]
+		return index.get(value.value if isinstance(value, Enum) else value, [])
+
+	def _user_candidates(self, filters: dict) -> Iterable["User"]:
+		if "username" in filters:
+			value = filters["username"]
+			usernames = dict.fromkeys(value) if isinstance(value, tuple) else (value,)
+			users = [self.users[username] for username in usernames if username in self.users]
+		elif "contractor" in filters:
+			users = self._lookup(self.users_by_contractor, filters["contractor"])
+		elif "rep" in filters:
+			users = self._lookup(self.users_by_rep, filters["rep"])
+		else:
+			return self.users.values()
+
+		if len(users) > 1 and any(isinstance(value, tuple) for value in filters.values()):
+			users = sorted(users, key=lambda user: self.user_positions[user.username])
+		return users
+
+	def _contract_candidates(self, filters: dict) -> Iterable["Contract"]:
+		if "id" in filters:
+			value = filters["id"]
+			ids = dict.fromkeys(value) if isinstance(value, tuple) else (value,)
+			return sorted((self.contracts[id] for id in ids if id in self.contracts), key=lambda contract: contract.id)
+		elif "contractee" in filters:
+			contracts = self._lookup(self.contracts_by_contractee, filters["contractee"])
+			if len(contracts) > 1 and isinstance(filters["contractee"], tuple):
+				contracts = sorted(contracts, key=lambda contract: contract.id)
+			return contracts
+		return self.contracts.values()
+
+	def fetch_users(self, filters: dict, limit: int | None = None, fields: tuple[str, ...] | None = None) -> list["User"]:
+		check_columns("users", tuple(filters) + (fields or ()))
+		return _filter(self._user_candidates(filters), filters, limit)
+
+	def fetch_contracts(self, filters: dict, limit: int | None = None, fields: tuple[str, ...] | None = None) -> list["Contract"]:
+		check_columns("contracts", tuple(filters) + (fields or ()))
+		return _filter(self._contract_candidates(filters), filters, limit)
+
+	def count_users(self, filters: dict) -> int:
+		return len(self.fetch_users(filters))
+
+	def count_contracts(self, filters: dict) -> int:
+		return len(self.fetch_contracts(filters))
@@ -0,0 +1,247 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+from dotenv import load_dotenv
+from aiohttp import web
+from .stream import decode_value_ranges
+from .client import HttpClient
+import hashlib
+import asyncio
+import aiohttp
+import json
+import os
+
+__all__ = ["SheetSource", "LiveSheetSource", "FileSheetSource", "ReplaySheetServer", "ReplaySheetSource", "record_sheet"]
+
+load_dotenv()
+
+# Overridable so syncs can run against a local stand-in for the Google APIs
+SHEETS_API_URL = os.getenv("SHEETS_API_URL", "https://sheets.googleapis.com/v4")
+DRIVE_API_URL = os.getenv("DRIVE_API_URL", "https://www.googleapis.com/drive/v3")
+CHUNK_SIZE = 64 * 1024
+REVISION_TIMEOUT = 10.0
+
+
+class SheetSource(ABC):  # Where a season sync gets its spreadsheet from
+	@abstractmethod
+	async def get_revision(self, spreadsheet_id: str) -> str | None:  # Changes whenever the spreadsheet does, None if unknown
+		...
+
+	@abstractmethod
+	async def batch_get(self, spreadsheet_id: str, ranges: list[str]) -> dict:  # Shaped like a Sheets values:batchGet response
+		...
+
+	# (range index, rows) for every range, in order. Streaming sources yield each range as soon as it has been received.
+	async def iter_ranges(self, spreadsheet_id: str, ranges: list[str]) -> AsyncIterator[tuple[int, list[list[str]]]]:
+		sheet_data = await self.batch_get(spreadsheet_id, ranges)
+		for i, value_range in enumerate(sheet_data["valueRanges"]):
+			yield i, value_range.get("values", [])
+
+	async def fetch_payload(self, spreadsheet_id: str, ranges: list[str]) -> bytes:  # The batchGet response as JSON, to be decoded elsewhere
+		return json.dumps(await self.batch_get(spreadsheet_id, ranges), ensure_ascii=False).encode()
+
+	async def close(self):  # Releases anything the source keeps open between syncs
+		pass
+
+
+class LiveSheetSource(SheetSource):
+	def __init__(
+		self,
+		api_key: str | None = None,
+		sheets_url: str = SHEETS_API_URL,
+		drive_url: str = DRIVE_API_URL,
+		stream: bool = False,
+		client: HttpClient | None = None,
+	):
+		self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+		self.sheets_url = sheets_url
+		self.drive_url = drive_url
+		self.stream = stream  # Decode the response while it downloads instead of buffering all of it first
+		self.client = client or HttpClient()
+		self._owns_client = client is None  # A shared client is closed by whoever made it, the bot for the live one
+
+	async def close(self):
+		if self._owns_client:
+			await self.client.close()
+
+	async def get_revision(self, spreadsheet_id: str) -> str | None:
+		try:
+			file = await self.client.get_json(
+				f"{self.drive_url}/files/{spreadsheet_id}", params={"fields": "modifiedTime", "key": self.api_key}, timeout=REVISION_TIMEOUT
+			)
+			return file.get("modifiedTime")
+		except (aiohttp.ClientError, TimeoutError):
+			return None
+
+	def _batch_get_args(self, spreadsheet_id: str, ranges: list[str]) -> tuple[str, dict]:
+		params = {"majorDimension": "ROWS", "valueRenderOption": "FORMATTED_VALUE", "ranges": ranges, "key": self.api_key}
+		return f"{self.sheets_url}/spreadsheets/{spreadsheet_id}/values:batchGet", params
+
+	async def batch_get(self, spreadsheet_id: str, ranges: list[str]) -> dict:
+		url, params = self._batch_get_args(spreadsheet_id, ranges)
+		return await self.client.get_json(url, params=params)
+
+	async def fetch_payload(self, spreadsheet_id: str, ranges: list[str]) -> bytes:
+		url, params = self._batch_get_args(spreadsheet_id, ranges)
+		return await self.client.get_bytes(url, params=params)
+
+	async def iter_ranges(self, spreadsheet_id: str, ranges: list[str]) -> AsyncIterator[tuple[int, list[list[str]]]]:
+		if not self.stream:
+			async for value_range in super().iter_ranges(spreadsheet_id, ranges):
+				yield value_range
+			return
+
+		url, params = self._batch_get_args(spreadsheet_id, ranges)
+		async with self.client.request("GET", url, params=params) as response:
+			response.raise_for_status()
+			async for value_range in decode_value_ranges(response.content.iter_chunked(CHUNK_SIZE), len(ranges)):
+				yield value_range
+
+
+class FileSheetSource(SheetSource):  # A recorded batchGet response, see record_sheet
+	def __init__(self, path: str, stream: bool = False):
+		self.path = path
+		self.stream = stream
+
+	def _read(self) -> bytes:
+		with open(self.path, "rb") as f:
+			return f.read()
+
+	def _hash(self) -> str:
+		digest = hashlib.blake2b(digest_size=16)
+		with open(self.path, "rb") as f:
+			while chunk := f.read(CHUNK_SIZE):
+				digest.update(chunk)
+		return digest.hexdigest()
+
+	async def _read_chunks(self) -> AsyncIterator[bytes]:  # Opened, read and closed in threads, like every other file access of a source
+		f = await asyncio.to_thread(open, self.path, "rb")
+		try:
+			while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+				yield chunk
+		finally:
+			await asyncio.to_thread(f.close)
+
+	async def get_revision(self, spreadsheet_id: str) -> str | None:
+		return await asyncio.to_thread(self._hash)
+
+	async def fetch_payload(self, spreadsheet_id: str, ranges: list[str]) -> bytes:
+		return await asyncio.to_thread(self._read)
+
+	async def batch_get(self, spreadsheet_id: str, ranges: list[str]) -> dict:
+		sheet_data = json.loads(await asyncio.to_thread(self._read))
+		if len(sheet_data["valueRanges"]) != len(ranges):
+			raise ValueError(f"{self.path} has {len(sheet_data['valueRanges'])} ranges, expected {len(ranges)}")
+		return sheet_data
+
+	async def iter_ranges(self, spreadsheet_id: str, ranges: list[str]) -> AsyncIterator[tuple[int, list[list[str]]]]:
+		if not self.stream:
+			async for value_range in super().iter_ranges(spreadsheet_id, ranges):
+				yield value_range
+			return
+
+		async for value_range in decode_value_ranges(self._read_chunks(), len(ranges)):
+			yield value_range
+
+
+class ReplaySheetServer:  # Serves a recorded batchGet response over HTTP the way the Sheets and Drive APIs would
+	def __init__(
+		self,
+		sheet_data: dict,
+		revision: str = "replay",
+		latency: float = 0.0,
+		max_rows: int | None = None,
+		failures: int = 0,
+		host: str = "127.0.0.1",
+	):
+		self.sheet_data = sheet_data
+		self.revision = revision
+		self.latency = latency  # Seconds added before every response
+		self.failures = failures  # The next this many requests get a 503, like a flaky upstream
+		self.max_rows = max_rows  # Truncates every range, to serve smaller payloads from the same recording
+		self.host = host
+		self.url: str | None = None
+		self.requests = 0
+		self._runner: web.AppRunner | None = None
+
+	async def _fail(self) -> web.Response | None:
+		self.requests += 1
+		await asyncio.sleep(self.latency)
+		if self.failures > 0:
+			self.failures -= 1
+			return web.Response(status=503, text="Replayed failure")
+		return None
+
+	async def _batch_get(self, request: web.Request) -> web.Response:
+		if (failure := await self._fail()) is not None:
+			return failure
+
+		sheet_data = self.sheet_data
+		if self.max_rows is not None:
+			value_ranges = [{**value_range, "values": value_range.get("values", [])[: self.max_rows]} for value_range in sheet_data["valueRanges"]]
+			sheet_data = {**sheet_data, "valueRanges": value_ranges}
+		return web.json_response(sheet_data)
+
+	async def _get_file(self, request: web.Request) -> web.Response:
+		if (failure := await self._fail()) is not None:
+			return failure
+		return web.json_response({"modifiedTime": self.revision})
+
+	async def start(self) -> str:
+		app = web.Application()
+		app.router.add_get("/v4/spreadsheets/{spreadsheet_id}/values:batchGet", self._batch_get)
+		app.router.add_get("/drive/v3/files/{spreadsheet_id}", self._get_file)
+
+		self._runner = web.AppRunner(app, access_log=None)
+		await self._runner.setup()
+		site = web.TCPSite(self._runner, self.host, 0)
+		await site.start()
+
+		host, port = self._runner.addresses[0][:2]
+		self.url = f"http://{host}:{port}"
+		return self.url
+
+	async def stop(self):
+		if self._runner is not None:
+			await self._runner.cleanup()
+			self._runner = None
+			self.url = None
+
+
+class ReplaySheetSource(LiveSheetSource):  # The live client pointed at a ReplaySheetServer, started on first use
+	def __init__(self, server: ReplaySheetServer, stream: bool = False, client: HttpClient | None = None):
+		super().__init__(api_key="replay", stream=stream, client=client)
+		self.server = server
+
+	async def _ensure_started(self):
+		if self.server.url is None:
+			url = await self.server.start()
+			self.sheets_url = f"{url}/v4"
+			self.drive_url = f"{url}/drive/v3"
+
+	async def get_revision(self, spreadsheet_id: str) -> str | None:
+		await self._ensure_started()
+		return await super().get_revision(spreadsheet_id)
+
+	async def batch_get(self, spreadsheet_id: str, ranges: list[str]) -> dict:
+		await self._ensure_started()
+		return await super().batch_get(spreadsheet_id, ranges)
+
+	async def fetch_payload(self, spreadsheet_id: str, ranges: list[str]) -> bytes:
+		await self._ensure_started()
+		return await super().fetch_payload(spreadsheet_id, ranges)
+
+	async def iter_ranges(self, spreadsheet_id: str, ranges: list[str]) -> AsyncIterator[tuple[int, list[list[str]]]]:
+		await self._ensure_started()
+		async for value_range in super().iter_ranges(spreadsheet_id, ranges):
+			yield value_range
+
+
+def _write_fixture(path: str, sheet_data: dict):
+	os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+	with open(path, "w", encoding="utf-8") as f:
+		json.dump(sheet_data, f, ensure_ascii=False)
+
+
+async def record_sheet(source: SheetSource, spreadsheet_id: str, ranges: list[str], path: str):  # Saves a fixture for FileSheetSource
+	sheet_data = await source.batch_get(spreadsheet_id, ranges)
+	await asyncio.to_thread(_write_fixture, path, sheet_data)
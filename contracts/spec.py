@@ -0,0 +1,495 @@
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from .classes import Contract, User, SeasonDB, SeasonSyncContext, ContractKind, ContractType, compile_changes
+from .sources import SheetSource
+from .sync import SyncReport, ChangeSet
+from .events import SyncEvent, sync_events
+from urllib.request import pathname2url
+from enum import Enum
+import dataclasses
+import importlib
+import hashlib
+import itertools
+import aiosqlite
+import asyncio
+import utils
+import json
+import os
+import re
+
+__all__ = [
+	"Cell",
+	"Sub",
+	"Equals",
+	"Lookup",
+	"Const",
+	"FromContract",
+	"Value",
+	"UserFields",
+	"ContractFields",
+	"DashboardTab",
+	"UpdateTab",
+	"AidTab",
+	"SeasonSpec",
+	"CompiledSeason",
+	"compile_season",
+]
+
+REVISION_META_KEY = "sheet_revision"
+PARSER_VERSION = 1  # Bump on any change to how rows are parsed that the spec doesn't show, so every row gets parsed again
+URL_REGEX = re.compile(r"(https?:\/\/[^\s]+)")
+
+# Steps a cell can go through after being stripped, see Cell
+STEP_TEMPLATES = {
+	"lower": "{}.lower()",
+	"upper": "{}.upper()",
+	"one_line": '{}.replace("\\n", "")',
+	"join_lines": '{}.replace("\\n", ", ")',
+	"url": "_first_url({})",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Sub:  # re.sub with a pattern compiled once
+	pattern: str
+	replacement: str
+
+
+@dataclass(frozen=True, slots=True)
+class Equals:  # True when the cell is exactly value
+	value: str
+
+
+@dataclass(frozen=True, slots=True)
+class Lookup:  # Maps the cell to an enum member, by exact match or by the first key the cell contains
+	mapping: dict[str, Any]
+	default: Any
+	contains: bool = False
+
+
+class Cell:  # A column of the tab, stripped, default if empty, then put through steps in order
+	__slots__ = ("column", "steps", "default")
+
+	def __init__(self, column: int, *steps: str | Sub | Equals | Lookup, default: str = ""):
+		self.column = column
+		self.steps = steps
+		self.default = default
+
+
+@dataclass(frozen=True, slots=True)
+class Const:
+	value: Any
+
+
+@dataclass(frozen=True, slots=True)
+class FromContract:  # Computed from the contract being updated rather than the row
+	function: Callable[[Contract], Any]
+
+
+Value = Cell | Const | FromContract
+
+
+@dataclass(frozen=True, slots=True)
+class UserFields:
+	fields: dict[str, Value]
+	compare: tuple[str, ...]  # The user is only updated, with all of fields, when one of these changed
+
+
+@dataclass(frozen=True, slots=True)
+class ContractFields:
+	type: ContractType
+	fields: dict[str, Value]
+	compare: tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class DashboardTab:  # Creates every user and normal contract, and keeps their statuses up to date
+	name: str
+	range: str
+	username: Cell
+	status: Cell
+	contracts: dict[ContractType, tuple[Cell, Cell]]  # Type -> (name, status), a name of no_contract means the user doesn't have it
+	no_contract: str = "-"
+
+
+@dataclass(frozen=True, slots=True)
+class UpdateTab:  # Fills in users and contracts the dashboard created
+	name: str
+	range: str
+	username: Cell
+	user: UserFields | None = None
+	contracts: tuple[ContractFields, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class AidTab:  # One aid contract per row, the nth row of a user being their nth aid. Users not in the season are created as newcomers
+	name: str
+	range: str
+	username: Cell
+	contract_type: Callable[[int], ContractType]
+	status: Cell
+	fields: dict[str, Value]
+	compare: tuple[str, ...]
+	newcomer: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class SeasonSpec:
+	spreadsheet_id: str
+	dashboard: DashboardTab
+	tabs: tuple[UpdateTab, ...]
+	aids: AidTab | None = None
+	optional_contracts: frozenset[ContractType] = frozenset()
+
+
+class _Compiler:  # Generates the source of a row parser that reads every column it needs exactly once
+	def __init__(self):
+		self.namespace: dict[str, Any] = {"_first_url": _first_url}
+		self.columns: set[int] = set()
+
+	def constant(self, value: Any) -> str:
+		name = f"_k{len(self.namespace)}"
+		self.namespace[name] = value
+		return name
+
+	def step(self, expression: str, step: str | Sub | Equals | Lookup) -> str:
+		match step:
+			case str():
+				return STEP_TEMPLATES[step].format(expression)
+			case Sub(pattern, replacement):
+				return f"{self.constant(re.compile(pattern))}.sub({replacement!r}, {expression})"
+			case Equals(value):
+				return f"({expression} == {value!r})"
+			case Lookup(mapping, default, False):
+				return f"{self.constant(mapping)}.get({expression}, {self.constant(default)})"
+			case Lookup(mapping, default, True):
+				return f"{self.constant(_contains_lookup(mapping, default))}({expression})"
+
+	def value(self, value: Value, contract: str = "contract") -> str:
+		match value:
+			case Cell():
+				self.columns.add(value.column)
+				expression = f"c{value.column}" if not value.default else f"(c{value.column} or {value.default!r})"
+				for step in value.steps:
+					expression = self.step(expression, step)
+				return expression
+			case Const(constant):
+				return repr(constant) if isinstance(constant, (str, int, bool, type(None))) else self.constant(constant)
+			case FromContract(function):
+				return f"{self.constant(function)}({contract})"
+
+	def build(self, name: str, parameters: str, body: list[str]) -> Callable:
+		reads = [f"c{i} = row[{i}].strip() if n > {i} else ''" for i in sorted(self.columns)]
+		source = "\n\t".join([f"def {name}({parameters}):", "n = len(row)", *reads, *body])
+		exec(compile(source, f"<{name}>", "exec"), self.namespace)
+		return self.namespace[name]
+
+
+def _first_url(text: str) -> str:
+	match = URL_REGEX.search(text)
+	return match.group(0) if match else ""
+
+
+def _contains_lookup(mapping: dict[str, Any], default: Any) -> Callable[[str], Any]:
+	def lookup(text: str) -> Any:
+		for key, value in mapping.items():
+			if key in text:
+				return value
+		return default
+
+	return lookup
+
+
+def _compile_value(name: str, value: Value) -> Callable[[list[str]], Any]:
+	compiler = _Compiler()
+	expression = compiler.value(value)
+	return compiler.build(name, "row", [f"return {expression}"])
+
+
+def _compile_values(name: str, values: list[Value]) -> Callable[[list[str]], tuple]:  # row -> tuple of values
+	compiler = _Compiler()
+	expressions = [compiler.value(value) for value in values]
+	return compiler.build(name, "row", [f"return ({', '.join(expressions)},)"])
+
+
+def _compile_changes(fields: dict[str, Value], compare: tuple[str, ...], target: str, extra: dict[str, str], compiler: _Compiler) -> list[str]:
+	# Lines that compute the compared fields, and the rest only when one of them differs from target
+	lines = [f"v_{name} = {compiler.value(fields[name], target)}" for name in compare]
+	changed = " or ".join(f"{target}.{name} != v_{name}" for name in compare)
+	values = [f"{name!r}: {f'v_{name}' if name in compare else compiler.value(value, target)}" for name, value in fields.items()]
+	values += [f"{name!r}: {expression}" for name, expression in extra.items()]
+	return lines + [f"changed = {{{', '.join(values)}}} if {changed} else None"]
+
+
+def _compile_update_tab(tab: UpdateTab, optional_contracts: frozenset[ContractType]) -> Callable:
+	# (row, user, contracts of the user) -> (user values or None, [(contract id, values)])
+	compiler = _Compiler()
+	body = ["user_values = None"]
+	if tab.user:
+		body += _compile_changes(tab.user.fields, tab.user.compare, "user", {}, compiler)
+		body += ["user_values = changed"]
+
+	body += ["contract_values = []"]
+	for contract in tab.contracts:
+		body += [f"contract = contracts.get({compiler.constant(contract.type)})", "if contract is not None:"]
+		extra = {"optional": repr(contract.type in optional_contracts)}
+		body += [f"\t{line}" for line in _compile_changes(contract.fields, contract.compare, "contract", extra, compiler)]
+		body += ["\tif changed is not None:", "\t\tcontract_values.append((contract.id, changed))"]
+
+	body += ["return user_values, contract_values"]
+	name = re.sub(r"\W", "_", tab.name.lower())
+	return compiler.build(f"parse_{name}", "row, user, contracts", body)
+
+
+class _NoContractIds:  # Handed to the parsers of a stage that aren't its contract creator
+	def __iter__(self):
+		return self
+
+	def __next__(self) -> int:
+		raise ValueError("Only the contract creator of a stage may create contracts")
+
+
+def _describe(value: Any) -> str:  # Stable across runs, unlike repr, which puts addresses in functions
+	if isinstance(value, Cell):
+		return f"Cell({value.column}, {_describe(value.steps)}, {value.default!r})"
+	if dataclasses.is_dataclass(value):
+		return f"{type(value).__name__}({', '.join(_describe(getattr(value, f.name)) for f in dataclasses.fields(value))})"
+	if isinstance(value, Enum):
+		return f"{type(value).__name__}.{value.name}"
+	if isinstance(value, dict):
+		return f"{{{', '.join(sorted(f'{_describe(k)}: {_describe(v)}' for k, v in value.items()))}}}"
+	if isinstance(value, (set, frozenset)):
+		return f"{{{', '.join(sorted(_describe(item) for item in value))}}}"
+	if isinstance(value, (list, tuple)):
+		return f"[{', '.join(_describe(item) for item in value)}]"
+	if callable(value) and hasattr(value, "__code__"):
+		return f"{value.__module__}.{value.__qualname__}:{hashlib.blake2b(value.__code__.co_code, digest_size=8).hexdigest()}"
+	return repr(value)
+
+
+def _import_season(module: str) -> "CompiledSeason":
+	return importlib.import_module(module).SEASON
+
+
+class CompiledSeason:
+	def __init__(self, spec: SeasonSpec, module: str | None = None):
+		self.spec = spec
+		self.module = module  # Where the season's SEASON lives, so worker processes can rebuild the parsers instead of pickling them
+		self.tabs: list[DashboardTab | UpdateTab | AidTab] = [spec.dashboard, *spec.tabs] + ([spec.aids] if spec.aids else [])
+		self.ranges = [tab.range for tab in self.tabs]  # Requested in this order, so valueRanges index i is self.tabs[i]
+		self.fingerprint = hashlib.blake2b(f"{PARSER_VERSION}:{_describe(spec)}".encode(), digest_size=16).digest()  # Mixed into row hashes
+		self.keys = [_compile_value(f"key_{i}", tab.username) for i, tab in enumerate(self.tabs)]
+
+		dashboard = spec.dashboard
+		self.dashboard_types = list(dashboard.contracts)
+		dashboard_values = [dashboard.username, dashboard.status] + [cell for cells in dashboard.contracts.values() for cell in cells]
+		self.parse_dashboard = _compile_values("parse_dashboard", dashboard_values)
+		self.parse_tabs = [_compile_update_tab(tab, spec.optional_contracts) for tab in spec.tabs]
+		if spec.aids:
+			self.parse_aid = _compile_values("parse_aid", [spec.aids.username, spec.aids.status, *spec.aids.fields.values()])
+
+	def __reduce__(self):
+		if self.module is None:
+			raise ValueError("Seasons compiled without a module can't be sent to a worker process")
+		return _import_season, (self.module,)
+
+	def _filter_changed_rows(self, i: int, rows: list[list[str]], session: ChangeSet, ctx: SeasonSyncContext, always: set[str] = frozenset()):
+		key = self.keys[i]
+		rows = [row for row in rows if key(row)]  # Open-ended ranges can end in blank rows
+		creates_users = i == 0 or self.tabs[i] is self.spec.aids
+		return ctx.changed_rows(session, self.tabs[i].name, rows, key, always=always, creates_users=creates_users, fingerprint=self.fingerprint)
+
+	async def _resolve_discord_ids(self, usernames: set[str], session: ChangeSet, ctx: SeasonSyncContext):
+		unresolved = {username for username in usernames if username not in ctx.users or ctx.users[username].discord_id is None}
+		discord_ids = await utils.resolve_madfigs_ids(unresolved)
+		ctx.discord_ids.update(discord_ids)
+
+		# Backfill users that were created before they showed up in madfigs
+		for username, discord_id in discord_ids.items():
+			if user := ctx.users.get(username):
+				session.update_user(username, discord_id=discord_id)
+				user.discord_id = discord_id
+
+	def _sync_dashboard(self, rows: list[list[str]], changes: ChangeSet, ctx: SeasonSyncContext):  # Adds what it creates to ctx
+		no_contract = self.spec.dashboard.no_contract
+		for row in rows:
+			username, user_status, *contract_cells = self.parse_dashboard(row)
+
+			if existing_user := ctx.users.get(username):
+				if existing_user.status != user_status:
+					changes.update_user(username, status=user_status)
+			else:
+				discord_id = ctx.discord_ids.get(username)
+				changes.create_user(username=username, status=user_status, discord_id=discord_id)
+				ctx.users[username] = User(username=username, status=user_status, discord_id=discord_id)
+
+			user_contracts = ctx.contracts.setdefault(username, {})
+			for i, contract_type in enumerate(self.dashboard_types):
+				contract_name, contract_status = contract_cells[2 * i], contract_cells[2 * i + 1]
+				if contract_name in (no_contract, ""):
+					continue
+
+				if existing_contract := user_contracts.get(contract_type):
+					if existing_contract.status != contract_status:
+						changes.update_contract(existing_contract.id, status=contract_status)
+				else:
+					id = changes.create_contract(contract_name, contract_type, ContractKind.NORMAL, contract_status, username)
+					user_contracts[contract_type] = Contract(
+						id=id, name=contract_name, type=contract_type, kind=ContractKind.NORMAL, status=contract_status, contractee=username
+					)
+
+	def _sync_tab(self, i: int, rows: list[list[str]], changes: ChangeSet, ctx: SeasonSyncContext):
+		parse = self.parse_tabs[i - 1]
+		key = self.keys[i]
+		for row in rows:
+			username = key(row)
+			if (user := ctx.users.get(username)) is None:
+				continue
+
+			user_values, contract_values = parse(row, user, ctx.contracts.get(username, {}))
+			if user_values is not None:
+				changes.update_user(username, **user_values)
+			for id, values in contract_values:
+				changes.update_contract(id, **values)
+
+	def _sync_aids(self, rows: list[list[str]], changes: ChangeSet, ctx: SeasonSyncContext):
+		aids = self.spec.aids
+		names = list(aids.fields)
+
+		aids_user_count: dict[str, int] = {}
+		newcomers: set[str] = set()
+		for row in rows:
+			username, contract_status, *values = self.parse_aid(row)
+			values = dict(zip(names, values))
+
+			if username not in ctx.users and username not in newcomers:  # User wasn't in season, create it then
+				newcomers.add(username)
+				changes.create_user(username=username, discord_id=ctx.discord_ids.get(username), **aids.newcomer)
+
+			aids_user_count[username] = aids_user_count.get(username, 0) + 1
+			contract_type = aids.contract_type(aids_user_count[username])
+
+			# Every row of a user is a different aid contract type, so contracts created here never need to be looked up again
+			if existing_contract := ctx.contracts.get(username, {}).get(contract_type):
+				if any(getattr(existing_contract, name) != values[name] for name in aids.compare):
+					changes.update_contract(existing_contract.id, status=contract_status, **values)
+			else:
+				changes.create_contract(
+					type=contract_type, kind=ContractKind.AID, status=contract_status, contractee=username, optional=False, **values
+				)
+
+	async def _parse_stage(self, session: ChangeSet, ctx: SeasonSyncContext, parsers: list[tuple[Callable[[ChangeSet], None], bool]]):
+		# Parsers of one stage only read what earlier stages added to ctx, so they run side by side, each into its own change set.
+		# Contract ids are handed out while parsing, so only one parser per stage, flagged True, may create contracts.
+		if sum(creates_contracts for _, creates_contracts in parsers) > 1:
+			raise ValueError("At most one parser per stage may create contracts")
+
+		change_sets = [session.change_set() if creates_contracts else ChangeSet(_NoContractIds()) for _, creates_contracts in parsers]
+		await asyncio.gather(*(asyncio.to_thread(parser, changes) for (parser, _), changes in zip(parsers, change_sets)))
+
+		# Applied in stage order rather than in the order parsing finished, so a sync always writes the same thing
+		for changes in change_sets:
+			session.extend(changes)
+
+	def parse_ranges(self, value_ranges: list[list[list[str]]], changes: ChangeSet, ctx: SeasonSyncContext):
+		# The same steps as the in-loop parse, one after the other, for when the whole sheet is already here
+		rows, changed_users = self._filter_changed_rows(0, value_ranges[0], changes, ctx)
+		self._sync_dashboard(rows, changes, ctx)
+		for i, tab in enumerate(self.tabs[1:], 1):
+			rows, _ = self._filter_changed_rows(i, value_ranges[i], changes, ctx, always=changed_users)
+			if tab is self.spec.aids:
+				self._sync_aids(rows, changes, ctx)
+			else:
+				self._sync_tab(i, rows, changes, ctx)
+
+	def parse_payload(self, payload: bytes, path: str, next_contract_id: int, season: str | None):
+		# Runs in a worker process, which reads the season's current state straight from its database. Only the raw response goes in and
+		# only the changes, tab reports and events (for season, if given) come out, so the bot's process never pickles the whole season.
+		return asyncio.run(self._parse_payload(payload, path, next_contract_id, season))
+
+	async def _parse_payload(self, payload: bytes, path: str, next_contract_id: int, season: str | None):
+		ctx = SeasonSyncContext()
+		async with aiosqlite.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True) as connection:
+			await ctx.load_from(connection)
+
+		value_ranges = [value_range.get("values", []) for value_range in json.loads(payload)["valueRanges"]]
+		if len(value_ranges) != len(self.ranges):
+			raise ValueError(f"The batchGet response has {len(value_ranges)} ranges, expected {len(self.ranges)}")
+
+		changes = ChangeSet(itertools.count(next_contract_id))
+		usernames = {
+			self.keys[i](row) for i, tab in enumerate(self.tabs) if tab is self.spec.dashboard or tab is self.spec.aids for row in value_ranges[i]
+		}
+		await self._resolve_discord_ids(usernames - {""}, changes, ctx)
+		self.parse_ranges(value_ranges, changes, ctx)
+
+		events = sync_events(season, changes.changes, ctx) if season is not None else None
+		return compile_changes(changes.changes), ctx.tab_reports, events, next(changes.contract_ids)
+
+	async def _parse_in_loop(self, session: ChangeSet, ctx: SeasonSyncContext, source: SheetSource):
+		# Ranges come in sheet order. Each one is filtered as soon as it's complete, so only its changed rows are held onto.
+		# The dashboard creates the users and contracts every other tab updates, so it is parsed on its own before the rest.
+		parsers: list[tuple[Callable[[ChangeSet], None], bool]] = []
+		changed_users: set[str] | None = None
+		async for i, rows in source.iter_ranges(self.spec.spreadsheet_id, self.ranges):
+			tab = self.tabs[i]
+			if tab is self.spec.dashboard or tab is self.spec.aids:
+				key = self.keys[i]
+				await self._resolve_discord_ids({key(row) for row in rows} - {""}, session, ctx)
+
+			if tab is self.spec.dashboard:
+				rows, changed_users = self._filter_changed_rows(i, rows, session, ctx)
+				await self._parse_stage(session, ctx, [(lambda changes, rows=rows: self._sync_dashboard(rows, changes, ctx), True)])
+				continue
+			if changed_users is None:
+				raise ValueError(f"{tab.range} came before the dashboard")
+
+			# A changed dashboard row can create contracts or change statuses the other tabs read, so those users are parsed everywhere
+			rows, _ = self._filter_changed_rows(i, rows, session, ctx, always=changed_users)
+			if tab is self.spec.aids:
+				parsers.append((lambda changes, rows=rows: self._sync_aids(rows, changes, ctx), True))
+			else:
+				parsers.append((lambda changes, i=i, rows=rows: self._sync_tab(i, rows, changes, ctx), False))
+
+		await self._parse_stage(session, ctx, parsers)
+
+	# With an executor, the sheet is parsed and diffed in a worker process instead of on the event loop
+	async def sync(
+		self, db: SeasonDB, report: SyncReport, source: SheetSource, events: list[SyncEvent] | None = None, executor: Executor | None = None
+	):
+		report.revision = await source.get_revision(self.spec.spreadsheet_id)
+		# What the last sync was parsed from, so a new parser or a regenerated madfigs.db (which can resolve more discord ids) still syncs
+		revision = f"{report.revision}:{self.fingerprint.hex()}:{utils.get_madfigs_mtime()}" if report.revision is not None else None
+		if revision is not None and revision == await db.get_meta(REVISION_META_KEY):
+			report.noop = True
+			return
+
+		async with db.write_session() as session:
+			if executor is None:
+				ctx = SeasonSyncContext()
+				await ctx.load(db)
+				await self._parse_in_loop(session, ctx, source)
+				tab_reports = ctx.tab_reports
+				session_events = sync_events(report.season, session.changes, ctx) if events is not None else None
+			else:
+				# Nothing is written until the session applies, so the worker reads the same state ctx.load would
+				payload = await source.fetch_payload(self.spec.spreadsheet_id, self.ranges)
+				season = report.season if events is not None else None
+				loop = asyncio.get_running_loop()
+				session.statements, tab_reports, session_events, next_contract_id = await loop.run_in_executor(
+					executor, self.parse_payload, payload, db.path, next(session.contract_ids), season
+				)
+				session.contract_ids = itertools.count(next_contract_id)
+
+			if revision is not None:
+				session.set_meta(REVISION_META_KEY, revision)
+
+		if events is not None:  # Only filled in once the session commits
+			events.extend(session_events)
+
+		report.tabs = tab_reports
+
+
+def compile_season(spec: SeasonSpec, module: str | None = None) -> CompiledSeason:  # Pass the module's __name__ to allow worker processes
+	return CompiledSeason(spec, module)
@@ -0,0 +1,151 @@
+from typing import AsyncIterator, Generator
+import codecs
+import json
+
+__all__ = ["ValueRangeDecoder", "decode_value_ranges"]
+
+WHITESPACE = " \t\n\r"
+INTERN_MAX_LENGTH = 32  # Statuses, checkboxes, usernames and the like repeat across rows and tabs, long cells rarely do
+
+
+class ValueRangeDecoder:  # Incremental decoder for a Sheets values:batchGet response, keeping only the row being decoded in memory
+	def __init__(self):
+		self._text = codecs.getincrementaldecoder("utf-8")()
+		self._json = json.JSONDecoder()
+		self._buffer = ""
+		self._pos = 0
+		self._final = False
+		self._events: list[tuple[int, list[str] | None]] = []
+		self._strings: dict[str, str] = {}
+		self._parser = self._parse()
+		next(self._parser)
+
+	# Returns (range index, row) for every row completed by chunk, and (range index, None) once a range has no more rows
+	def feed(self, chunk: bytes, final: bool = False) -> list[tuple[int, list[str] | None]]:
+		self._buffer = self._buffer[self._pos :] + self._text.decode(chunk, final)
+		self._pos = 0
+		self._final = final
+		try:
+			self._parser.send(None)
+		except StopIteration:
+			if self._buffer[self._pos :].strip(WHITESPACE):
+				raise ValueError("Unexpected data after the batchGet response")
+		else:
+			if final:
+				raise ValueError("The batchGet response ended early")
+
+		events, self._events = self._events, []
+		return events
+
+	# The parser is a generator that yields whenever it needs more of the response, so it can pick up mid-value on the next feed
+	def _parse(self) -> Generator[None, None, None]:
+		yield
+		yield from self._expect("{")
+		first = True
+		while (yield from self._next_member("}", first)):
+			first = False
+			key = yield from self._value()
+			yield from self._expect(":")
+			if key == "valueRanges":
+				yield from self._value_ranges()
+			else:
+				yield from self._value()
+
+	def _value_ranges(self):
+		intern = self._strings.setdefault
+		yield from self._expect("[")
+		index = 0
+		while (yield from self._next_member("]", index == 0)):
+			yield from self._expect("{")
+			first = True
+			while (yield from self._next_member("}", first)):
+				first = False
+				key = yield from self._value()
+				yield from self._expect(":")
+				if key != "values":
+					yield from self._value()
+					continue
+
+				yield from self._expect("[")
+				first_row = True
+				while (yield from self._next_member("]", first_row)):
+					first_row = False
+					row = yield from self._value()
+					self._events.append((index, [cell if len(cell) > INTERN_MAX_LENGTH else intern(cell, cell) for cell in row]))
+
+			self._events.append((index, None))  # Empty ranges have no values at all
+			index += 1
+
+	def _skip_whitespace(self):
+		while True:
+			while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+				self._pos += 1
+			if self._pos < len(self._buffer):
+				return
+			if self._final:
+				raise ValueError("The batchGet response ended early")
+			yield
+
+	def _expect(self, char: str):
+		yield from self._skip_whitespace()
+		if self._buffer[self._pos] != char:
+			raise ValueError(f"Expected {char!r} at {self._buffer[self._pos : self._pos + 20]!r}")
+		self._pos += 1
+
+	def _next_member(self, close: str, first: bool):  # Consumes the separator before the next member, False once the container closes
+		yield from self._skip_whitespace()
+		char = self._buffer[self._pos]
+		if char == close:
+			self._pos += 1
+			return False
+		if not first:
+			if char != ",":
+				raise ValueError(f"Expected ',' or {close!r} at {self._buffer[self._pos : self._pos + 20]!r}")
+			self._pos += 1
+		return True
+
+	def _value(self):
+		yield from self._skip_whitespace()
+		while True:
+			try:
+				value, end = self._json.raw_decode(self._buffer, self._pos)
+			except json.JSONDecodeError:
+				if self._final:
+					raise
+			else:
+				# A number at the very end of the buffer might continue in the next chunk
+				if end < len(self._buffer) or self._final:
+					self._pos = end
+					return value
+			yield
+
+
+async def decode_value_ranges(chunks: AsyncIterator[bytes], expected: int) -> AsyncIterator[tuple[int, list[list[str]]]]:
+	decoder = ValueRangeDecoder()
+	completed: list[tuple[int, list[list[str]]]] = []
+	rows: list[list[str]] = []
+	received = 0
+
+	def collect(events: list[tuple[int, list[str] | None]]):
+		nonlocal rows
+		for index, row in events:
+			if row is not None:
+				rows.append(row)
+			else:
+				completed.append((index, rows))
+				rows = []
+
+	async for chunk in chunks:
+		collect(decoder.feed(chunk))
+		for value_range in completed:
+			yield value_range
+		received += len(completed)
+		completed.clear()
+
+	collect(decoder.feed(b"", final=True))
+	for value_range in completed:
+		yield value_range
+	received += len(completed)
+
+	if received != expected:
+		raise ValueError(f"The batchGet response has {received} ranges, expected {expected}")
@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Iterator, TYPE_CHECKING
+import hashlib
+import json
+
+if TYPE_CHECKING:
+	from .classes import UserStatus, ContractType, ContractKind, ContractStatus
+
+__all__ = [
+	"TabReport",
+	"SyncReport",
+	"CreateUser",
+	"UpdateUser",
+	"CreateContract",
+	"UpdateContract",
+	"SetRowHash",
+	"SetMeta",
+	"Change",
+	"ChangeSet",
+	"hash_rows",
+]
+
+
+@dataclass(slots=True)
+class TabReport:
+	changed: int = 0  # Rows that were parsed and diffed
+	skipped: int = 0  # Rows whose hash matched the last sync
+
+
+@dataclass
+class SyncReport:
+	season: str
+	duration: float = 0.0
+	noop: bool = False  # The spreadsheet revision hadn't changed, so nothing was fetched or parsed
+	revision: str | None = None
+	tabs: dict[str, TabReport] = field(default_factory=dict)
+
+	@property
+	def changed(self) -> int:
+		return sum(tab.changed for tab in self.tabs.values())
+
+	@property
+	def skipped(self) -> int:
+		return sum(tab.skipped for tab in self.tabs.values())
+
+
+@dataclass(slots=True)
+class CreateUser:
+	username: str
+	values: dict
+
+
+@dataclass(slots=True)
+class UpdateUser:
+	username: str
+	values: dict
+
+
+@dataclass(slots=True)
+class CreateContract:
+	id: int
+	values: dict
+
+
+@dataclass(slots=True)
+class UpdateContract:
+	id: int
+	values: dict
+
+
+@dataclass(slots=True)
+class SetRowHash:
+	tab: str
+	key: str
+	hash: bytes
+
+
+@dataclass(slots=True)
+class SetMeta:
+	key: str
+	value: str | None
+
+
+Change = CreateUser | UpdateUser | CreateContract | UpdateContract | SetRowHash | SetMeta
+
+
+class ChangeSet:  # Writes produced by parsing, in the order they have to be applied, see SeasonWriteSession
+	def __init__(self, contract_ids: Iterator[int] | None = None):
+		self.contract_ids = contract_ids if contract_ids is not None else count(1)  # Shared between change sets of one session
+		self.changes: list[Change] = []
+
+	def __len__(self) -> int:
+		return len(self.changes)
+
+	def create_user(self, username: str, status: "UserStatus", **kwargs):
+		self.changes.append(CreateUser(username, {"status": status, **kwargs}))
+
+	def create_contract(self, name: str, type: "ContractType", kind: "ContractKind", status: "ContractStatus", contractee: str, **kwargs) -> int:
+		id = next(self.contract_ids)
+		self.changes.append(CreateContract(id, {"name": name, "type": type, "kind": kind, "status": status, "contractee": contractee, **kwargs}))
+		return id
+
+	def update_user(self, username: str, **kwargs):
+		self.changes.append(UpdateUser(username, kwargs))
+
+	def update_contract(self, id: int, **kwargs):
+		self.changes.append(UpdateContract(id, kwargs))
+
+	def set_row_hash(self, tab: str, key: str, hash: bytes):
+		self.changes.append(SetRowHash(tab, key, hash))
+
+	def set_meta(self, key: str, value: str | None):
+		self.changes.append(SetMeta(key, value))
+
+	def change_set(self) -> "ChangeSet":  # An empty change set drawing contract ids from the same sequence
+		return ChangeSet(self.contract_ids)
+
+	def extend(self, change_set: "ChangeSet"):
+		self.changes.extend(change_set.changes)
+
+
+def hash_rows(rows: list[list[str]], key: bytes = b"") -> bytes:  # key is mixed in, so the same rows hash differently under another parser
+	return hashlib.blake2b(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode(), digest_size=16, key=key).digest()
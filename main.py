@@ -1,26 +1,66 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Mapping, Optional
 from config import BOT_CONFIG, BASE_EMBED_COLOR
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 import utils
 import contracts
+import multiprocessing
+import logging
 import discord
 import os
 
 load_dotenv()
+logger = logging.getLogger("bot")
 
 
 class Natsumin(commands.Bot):
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 
+		# Kept open for the bot's lifetime so syncs reuse connections instead of a new handshake every 10 minutes
+		self.http_client = contracts.HttpClient()
+		self.sheet_source = contracts.LiveSheetSource(client=self.http_client)
+		self.events = contracts.EventBus()  # What each sync changed, for cogs to follow instead of re-reading the season
+		self.sync_executor = self.create_sync_executor()
+		self.loop_lag = utils.LoopLagMonitor()
+
 		self.sync_to_sheet.start()
+		self.maintain_databases.start()
 		self.anicord: discord.Guild
 
 	async def on_ready(self):
 		os.system("cls" if os.name == "nt" else "clear")
 		print(f"Logged in as {self.user.name}#{self.user.discriminator}!")
 		self.anicord = self.get_guild(994071728017899600)
+		self.loop_lag.start()
+		utils.watch_search_indexes(await contracts.get_season_db())  # Built ahead of the first autocomplete
+
+	def create_sync_executor(self) -> ProcessPoolExecutor | None:  # None parses syncs on the event loop
+		if not BOT_CONFIG.parse_in_worker:
+			return None
+		if "fork" not in multiprocessing.get_all_start_methods():
+			logger.warning("parse_in_worker needs fork, which isn't available on this platform, so syncs are parsed on the event loop")
+			return None
+
+		# Forked rather than spawned, since spawning would run this file again in the worker. The worker is started right away so the fork
+		# happens before the bot has any other threads, and then kept for every sync. Only call this from __init__ for that reason.
+		executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork"))
+		executor.submit(os.getpid)
+		return executor
+
+	async def sync_season(self, season: str = BOT_CONFIG.active_season) -> contracts.SyncReport:  # What every sync of the bot goes through
+		try:
+			return await contracts.sync_season_db(season, source=self.sheet_source, bus=self.events, executor=self.sync_executor)
+		except BrokenProcessPool:
+			# The worker died, most likely killed for memory. A new one would be forked from a bot that has threads by now, so syncs are
+			# parsed on the event loop instead, until the next restart. Nothing was written, so this one is simply parsed again.
+			if self.sync_executor is not None:
+				logger.exception("The sync worker process died, parsing syncs on the event loop from now on")
+				self.sync_executor.shutdown(wait=False, cancel_futures=True)
+				self.sync_executor = None
+			return await contracts.sync_season_db(season, source=self.sheet_source, bus=self.events)
 
 	async def get_contract_user(self, *, id: int = None, username: str = None) -> discord.User | None:
 		if id:
@@ -36,14 +76,33 @@ class Natsumin(commands.Bot):
 					return member
 		return None
 
+	async def close(self):
+		self.sync_to_sheet.cancel()
+		self.maintain_databases.cancel()
+		await contracts.close_season_dbs()
+		await self.http_client.close()
+		await self.loop_lag.stop()
+		if self.sync_executor is not None:
+			self.sync_executor.shutdown(wait=False, cancel_futures=True)
+		await super().close()
+
 	@tasks.loop(minutes=10)
 	async def sync_to_sheet(self):
-		await contracts.sync_season_db()
+		if not contracts.is_season_frozen(BOT_CONFIG.active_season):
+			await self.sync_season()
 
 	@sync_to_sheet.before_loop
 	async def before_sync(self):
 		await self.wait_until_ready()
 
+	@tasks.loop(hours=6)
+	async def maintain_databases(self):
+		await contracts.maintain_season_dbs()
+
+	@maintain_databases.before_loop
+	async def before_maintain(self):
+		await self.wait_until_ready()
+
 
 bot = Natsumin(
 	command_prefix=commands.when_mentioned_or(BOT_CONFIG.prefix),
@@ -80,7 +139,7 @@ class Help(commands.HelpCommand):
 			command_signatures = [self.get_command_signature(c) for c in filtered]
 
 			if command_signatures:
-				embed.description += "\n".join([f"> {s}" for s in command_signatures]
+				embed.description += "\n".join([f"> {s}" for s in command_signatures])
 
 		channel = self.get_destination()
 		await channel.send(embed=embed)
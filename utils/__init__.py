@@ -1,4 +1,6 @@
 from .contracts import *  # noqa: F403
+from .madfigs import *  # noqa: F403
+from .lag import *  # noqa: F403
 import config
 import math
 
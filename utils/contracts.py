@@ -1,53 +1,98 @@
 from typing import TYPE_CHECKING
 
-from async_lru import alru_cache
-import aiosqlite
 import datetime
+import asyncio
+import logging
 import discord
 import config
 import contracts
 import re
-import os
+
+from .madfigs import get_madfigs_aliases, find_madfigs_user
+from .search import SearchIndex
 
 if TYPE_CHECKING:
 	from main import Natsumin
 
 
-@alru_cache
-async def get_usernames(season_db: contracts.SeasonDB, query: str = "", limit: int = None) -> list[str]:
-	sql_query = "SELECT username FROM users WHERE lower(username) LIKE ?"
-	if limit:
-		sql_query += f" LIMIT {limit}"
-	async with season_db.connect() as db:
-		async with db.execute(sql_query, (f"%{query.lower()}%",)) as cursor:
-			return [row[0] for row in await cursor.fetchall()]
+logger = logging.getLogger("bot.contracts")
+
+_search_indexes: dict[contracts.SeasonDB, tuple[int, SearchIndex, SearchIndex]] = {}  # Season -> (version, usernames, reps), the latest built
+_search_index_tasks: dict[contracts.SeasonDB, asyncio.Task] = {}
+
+
+async def _build_search_indexes(season_db: contracts.SeasonDB):
+	version = season_db.version
+	users = await season_db.fetch_users(fields=("username", "rep"))
+	usernames = [user.username for user in users]
+	aliases = await get_madfigs_aliases(usernames)
+
+	def build() -> tuple[SearchIndex, SearchIndex]:
+		username_index = SearchIndex([*((username, username) for username in usernames), *aliases.items()])
+		rep_index = SearchIndex((user.rep, user.rep) for user in users if user.rep and user.rep != "AIDS")
+		return username_index, rep_index
+
+	username_index, rep_index = await asyncio.to_thread(build)  # Every n-gram of every name, too slow for the event loop
+	if season_db not in _search_indexes or _search_indexes[season_db][0] <= version:  # A build started before a later sync can finish last
+		_search_indexes[season_db] = (version, username_index, rep_index)
+
+
+def _log_search_index_failure(task: asyncio.Task):  # Nothing else awaits the builds syncs start
+	if not task.cancelled() and (error := task.exception()):
+		logger.error("Failed to build the search indexes", exc_info=error)
+
+
+def _schedule_search_indexes(season_db: contracts.SeasonDB):  # Sync hook
+	task = _search_index_tasks[season_db] = asyncio.create_task(_build_search_indexes(season_db))
+	task.add_done_callback(_log_search_index_failure)
+
+
+def _forget_search_indexes(season_db: contracts.SeasonDB):  # Close hook
+	if task := _search_index_tasks.pop(season_db, None):
+		task.cancel()
+	_search_indexes.pop(season_db, None)
+
 
+def watch_search_indexes(season_db: contracts.SeasonDB):  # Builds the season's indexes now and again after every sync, has to be called in the loop
+	if season_db not in _search_index_tasks:
+		season_db.add_sync_hook(_schedule_search_indexes)
+		season_db.add_close_hook(_forget_search_indexes)
+		_schedule_search_indexes(season_db)
 
-@alru_cache
-async def get_reps(season_db: contracts.SeasonDB, query: str = "", limit: int = None) -> list[str]:
-	sql_query = "SELECT DISTINCT rep FROM users WHERE upper(rep) LIKE ?"
-	if limit:
-		sql_query += f" LIMIT {limit}"
-	async with season_db.connect() as db:
-		async with db.execute(sql_query, (f"%{query.lower()}%",)) as cursor:
-			return [row[0] for row in await cursor.fetchall() if row[0] != "AIDS"]
+
+async def get_search_indexes(season_db: contracts.SeasonDB) -> tuple[SearchIndex, SearchIndex]:
+	# While a sync's rebuild runs the previous indexes are returned, so only the first search of a season can wait on a build
+	watch_search_indexes(season_db)
+	if season_db not in _search_indexes:
+		if (task := _search_index_tasks[season_db]).done():
+			_schedule_search_indexes(season_db)  # The last build failed
+			task = _search_index_tasks[season_db]
+		await asyncio.shield(task)
+
+	_, username_index, rep_index = _search_indexes[season_db]
+	return username_index, rep_index
 
 
 async def get_slash_usernames(ctx: discord.AutocompleteContext):
 	season_db = await contracts.get_season_db()
-	return await get_usernames(season_db, query=ctx.value.strip(), limit=25)
+	username_index, _ = await get_search_indexes(season_db)
+	return username_index.search(ctx.value.strip(), limit=25)
 
 
 async def get_slash_reps(ctx: discord.AutocompleteContext):
 	season_db = await contracts.get_season_db()
-	return await get_reps(season_db, query=ctx.value.strip(), limit=25)
+	_, rep_index = await get_search_indexes(season_db)
+	return rep_index.search(ctx.value.strip(), limit=25)
+
+
+TARGET_FIELDS = ("username", "discord_id", "contractor")  # All that get_target reads from the users it walks through
 
 
 async def _get_contract_user(season_db: contracts.SeasonDB, username: str) -> contracts.User:
-	user: contracts.User = await season_db.fetch_user(username=username)
+	user: contracts.User = await season_db.fetch_user(username=username, fields=TARGET_FIELDS)
 	if not user:
-		if d := await find_madfigs_user(search_name=username):
-			return await season_db.fetch_user(username=(*[s.strip().lower() for s in d["previous_names"].split(",")],))
+		if (d := await find_madfigs_user(search_name=username)) and d["previous_names"]:
+			return await season_db.fetch_user(username=(*d["previous_names"],), fields=TARGET_FIELDS)
 	else:
 		return user
 
@@ -72,12 +117,12 @@ async def get_target(
 
 	match username:
 		case "[contractee]":
-			if contractee := await season_db.fetch_user(contractor=ctx_user.name):
+			if contractee := await season_db.fetch_user(contractor=ctx_user.name, fields=TARGET_FIELDS):
 				username = contractee.username
 				user_id = contractee.discord_id
 		case "[contractor]":
-			user = await season_db.fetch_user(username=ctx_user.name)
-			if contractor := await season_db.fetch_user(username=user.contractor):
+			user = await season_db.fetch_user(username=ctx_user.name, fields=TARGET_FIELDS)
+			if contractor := await season_db.fetch_user(username=user.contractor, fields=TARGET_FIELDS):
 				username = contractor.username
 				user_id = contractor.discord_id
 		case match if match := re.match(r"(\S*)\[(\S*)]", username):
@@ -86,11 +131,11 @@ async def get_target(
 			if check_user:
 				match check_type:
 					case "contractee":
-						if contractee := await season_db.fetch_user(contractor=check_user.username):
+						if contractee := await season_db.fetch_user(contractor=check_user.username, fields=TARGET_FIELDS):
 							username = contractee.username
 							user_id = contractee.discord_id
 					case "contractor":
-						if contractor := await season_db.fetch_user(username=check_user.contractor):
+						if contractor := await season_db.fetch_user(username=check_user.contractor, fields=TARGET_FIELDS):
 							username = contractor.username
 							user_id = contractor.discord_id
 		case _:
@@ -145,41 +190,3 @@ def get_common_embed(
 	else:
 		embed.set_footer(text=f"Data from {season}", icon_url="https://cdn.discordapp.com/emojis/998705274074435584.webp?size=4096")
 	return embed
-
-
-@alru_cache  # NOTE: Could probably make all madfigs sheet related stuff better but works for now
-async def find_madfigs_user(user_id: int = None, search_name: str = None) -> dict | None:
-	if not os.path.isfile("data/madfigs.db"):
-		return None
-
-	if not user_id and not search_name:
-		raise ValueError("You must provide at least one of user_id, search_name.")
-
-	query = "SELECT * FROM users WHERE "
-	params = []
-	conditions = []
-
-	if user_id:
-		conditions.append("user_id = ?")
-		params.append(user_id)
-	if search_name:
-		conditions.append("username = ?")
-		params.append(search_name)
-
-	query += " OR ".join(conditions)
-
-	async with aiosqlite.connect("data/madfigs.db") as db:
-		async with db.execute(query, params) as cursor:
-			row = await cursor.fetchone()
-			if row:
-				return {"user_id": row[0], "username": row[1], "previous_names": row[2]}
-
-		async with db.execute("SELECT * from users WHERE previous_names != ''") as cursor:
-			rows = await cursor.fetchall()
-			for user_id, username, prev_names in rows:
-				for prev in prev_names.split():
-					prev = prev.strip().lower()
-					if search_name == prev:
-						return {"user_id": user_id, "username": username, "previous_names": prev_names}
-
-	return None
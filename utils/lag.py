@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+import asyncio
+import time
+
+__all__ = ["LagStats", "LoopLagMonitor"]
+
+
+@dataclass(slots=True)
+class LagStats:
+	samples: int = 0
+	lag_total: float = 0.0
+	lag_max: float = 0.0
+
+	@property
+	def lag_avg(self) -> float:
+		return self.lag_total / self.samples if self.samples else 0.0
+
+
+class LoopLagMonitor:  # How late a task that only sleeps gets woken up, which is how long commands and heartbeats wait on the loop too
+	def __init__(self, interval: float = 0.1):
+		self.interval = interval
+		self.stats = LagStats()
+		self._task: asyncio.Task | None = None
+
+	@property
+	def running(self) -> bool:
+		return self._task is not None and not self._task.done()
+
+	def start(self):  # Has to be called with the loop running
+		if not self.running:
+			self._task = asyncio.create_task(self._run())
+
+	async def stop(self):
+		if self._task is not None:
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+			self._task = None
+
+	def reset(self) -> LagStats:  # Starts a new measurement, returning the previous one
+		stats, self.stats = self.stats, LagStats()
+		return stats
+
+	async def _run(self):
+		while True:
+			start = time.perf_counter()
+			await asyncio.sleep(self.interval)
+			lag = max(0.0, time.perf_counter() - start - self.interval)
+			self.stats.samples += 1
+			self.stats.lag_total += lag
+			self.stats.lag_max = max(self.stats.lag_max, lag)
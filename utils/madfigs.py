@@ -0,0 +1,180 @@
+from contextlib import asynccontextmanager
+from async_lru import alru_cache
+from typing import Iterable
+from urllib.request import pathname2url
+import aiosqlite
+import asyncio
+import json
+import re
+import os
+
+__all__ = [
+	"MADFIGS_PATH",
+	"MADFIGS_INDEX_PATH",
+	"split_previous_names",
+	"get_madfigs_mtime",
+	"connect_madfigs",
+	"find_madfigs_user",
+	"resolve_madfigs_ids",
+	"get_madfigs_aliases",
+]
+
+MADFIGS_PATH = "data/madfigs.db"  # Regenerated outside the bot, and only ever read here
+MADFIGS_INDEX_PATH = "data/madfigs_index.db"
+
+# The users lookups need, with previous_names split out of users.previous_names. Rebuilt whenever madfigs.db is regenerated
+INDEX_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS users (
+	user_id INTEGER NOT NULL,
+	username TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_user_id ON users(user_id);
+CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE TABLE IF NOT EXISTS previous_names (
+	name TEXT NOT NULL,
+	user_id INTEGER NOT NULL,
+	PRIMARY KEY (name, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_previous_names_user_id ON previous_names(user_id);
+CREATE TABLE IF NOT EXISTS index_meta (
+	key TEXT PRIMARY KEY,
+	value TEXT
+) WITHOUT ROWID;
+"""
+
+_indexed_mtime: int | None = None  # mtime of madfigs.db the index was last known to be built from, in this process
+_index_lock: tuple[asyncio.AbstractEventLoop, asyncio.Lock] | None = None
+
+
+def split_previous_names(previous_names: str | None) -> list[str]:  # Older rows are comma separated, newer ones whitespace separated
+	return [name.lower() for name in re.split(r"[,\s]+", previous_names or "") if name]
+
+
+def get_madfigs_mtime() -> int | None:  # None without a madfigs.db
+	try:
+		return os.stat(MADFIGS_PATH).st_mtime_ns
+	except FileNotFoundError:
+		return None
+
+
+def _get_index_lock() -> asyncio.Lock:  # One per event loop, since the sync worker runs every parse in a new one
+	global _index_lock
+
+	loop = asyncio.get_running_loop()
+	if _index_lock is None or _index_lock[0] is not loop:
+		_index_lock = (loop, asyncio.Lock())
+	return _index_lock[1]
+
+
+async def _build_index(index: aiosqlite.Connection, mtime: int):
+	await index.executescript(INDEX_SCHEMA)
+	await index.execute("BEGIN IMMEDIATE")  # Other processes building at the same time wait here, then find it already built
+	async with index.execute("SELECT value FROM index_meta WHERE key = 'madfigs_mtime'") as cursor:
+		row = await cursor.fetchone()
+	if row and row[0] == str(mtime):
+		await index.commit()
+		return
+
+	async with aiosqlite.connect(f"file:{pathname2url(os.path.abspath(MADFIGS_PATH))}?mode=ro", uri=True) as source:
+		async with source.execute("SELECT user_id, username, previous_names FROM users") as cursor:
+			rows = await cursor.fetchall()
+
+	await index.execute("DELETE FROM users")
+	await index.execute("DELETE FROM previous_names")
+	await index.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)", ((user_id, username) for user_id, username, _ in rows))
+	await index.executemany(
+		"INSERT OR IGNORE INTO previous_names (name, user_id) VALUES (?, ?)",
+		((name, user_id) for user_id, _, previous_names in rows for name in split_previous_names(previous_names)),
+	)
+	await index.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES ('madfigs_mtime', ?)", (str(mtime),))
+	await index.commit()
+
+
+@asynccontextmanager
+async def connect_madfigs():  # To the index rather than madfigs.db itself, which has everything the lookups read
+	global _indexed_mtime
+
+	mtime = os.stat(MADFIGS_PATH).st_mtime_ns
+	if _indexed_mtime != mtime:
+		async with _get_index_lock():
+			if _indexed_mtime != mtime:
+				async with aiosqlite.connect(MADFIGS_INDEX_PATH, timeout=60) as index:
+					await _build_index(index, mtime)
+				_indexed_mtime = mtime
+
+	async with aiosqlite.connect(MADFIGS_INDEX_PATH) as db:
+		yield db
+
+
+async def find_madfigs_user(user_id: int = None, search_name: str = None) -> dict | None:
+	if not os.path.isfile(MADFIGS_PATH):
+		return None
+
+	if not user_id and not search_name:
+		raise ValueError("You must provide at least one of user_id, search_name.")
+
+	# Keyed by the mtime so nothing, misses included, is answered from before madfigs.db was regenerated
+	return await _find_madfigs_user(os.stat(MADFIGS_PATH).st_mtime_ns, user_id, search_name)
+
+
+@alru_cache(maxsize=1024)  # NOTE: Could probably make all madfigs sheet related stuff better but works for now
+async def _find_madfigs_user(mtime: int, user_id: int | None, search_name: str | None) -> dict | None:
+	# Exact id or username first, then whoever used search_name before, along with all of that user's previous names
+	query = """
+		WITH match AS (
+			SELECT user_id, username, 0 AS priority FROM users WHERE user_id = ? OR username = ?
+			UNION ALL
+			SELECT u.user_id, u.username, 1 FROM previous_names p JOIN users u ON u.user_id = p.user_id WHERE p.name = ?
+			ORDER BY priority LIMIT 1
+		)
+		SELECT user_id, username, (SELECT group_concat(p.name, ' ') FROM previous_names p WHERE p.user_id = match.user_id) FROM match
+	"""
+	async with connect_madfigs() as db:
+		async with db.execute(query, (user_id, search_name, search_name.lower() if search_name else None)) as cursor:
+			row = await cursor.fetchone()
+
+	if row:
+		return {"user_id": row[0], "username": row[1], "previous_names": split_previous_names(row[2])}
+	return None
+
+
+async def resolve_madfigs_ids(usernames: Iterable[str]) -> dict[str, int]:  # Same matching as find_madfigs_user, for many names in one query
+	usernames = set(usernames)
+	if not usernames or not os.path.isfile(MADFIGS_PATH):
+		return {}
+
+	query = """
+		WITH names(name) AS (SELECT value FROM json_each(?))
+		SELECT name, coalesce(
+			(SELECT user_id FROM users WHERE username = name LIMIT 1),
+			(SELECT user_id FROM previous_names WHERE previous_names.name = lower(names.name) LIMIT 1)
+		) FROM names
+	"""
+	async with connect_madfigs() as db:
+		async with db.execute(query, (json.dumps(list(usernames)),)) as cursor:
+			return {name: user_id for name, user_id in await cursor.fetchall() if user_id is not None}
+
+
+async def get_madfigs_aliases(usernames: list[str]) -> dict[str, str]:  # Current and previous madfigs names -> season username
+	if not os.path.isfile(MADFIGS_PATH):
+		return {}
+
+	names_by_user: dict[int, list[str]] = {}
+	async with connect_madfigs() as db:
+		query = "SELECT u.user_id, u.username, p.name FROM users u LEFT JOIN previous_names p ON p.user_id = u.user_id"
+		async with db.execute(query) as cursor:
+			for user_id, username, previous_name in await cursor.fetchall():
+				names = names_by_user.setdefault(user_id, [username.lower()])
+				if previous_name:
+					names.append(previous_name)
+
+	season_usernames = {username.lower(): username for username in usernames}
+	aliases: dict[str, str] = {}
+	for names in names_by_user.values():
+		season_username = next((season_usernames[name] for name in names if name in season_usernames), None)
+		if season_username:
+			for name in names:
+				aliases.setdefault(name, season_username)
+
+	return aliases
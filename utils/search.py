@@ -0,0 +1,91 @@
+from rapidfuzz.utils import default_process
+from rapidfuzz import fuzz, process
+from typing import Iterable
+import asyncio
+import bisect
+
+__all__ = ["SearchIndex"]
+
+GRAM_SIZE = 3
+
+
+class SearchIndex:  # Case-insensitive substring search over (key, value) pairs, prefix matches ranked first
+	def __init__(self, entries: Iterable[tuple[str, str]]):
+		unique: dict[str, str] = {}
+		for key, value in entries:
+			if key:
+				unique.setdefault(key.lower(), value)
+
+		self.keys: list[str] = sorted(unique)
+		self.values: list[str] = [unique[key] for key in self.keys]
+
+		# Every 1, 2 and 3 character substring -> sorted positions in self.keys
+		self.grams: dict[str, list[int]] = {}
+		for i, key in enumerate(self.keys):
+			seen = set()
+			for size in range(1, GRAM_SIZE + 1):
+				for start in range(len(key) - size + 1):
+					gram = key[start : start + size]
+					if gram not in seen:
+						seen.add(gram)
+						self.grams.setdefault(gram, []).append(i)
+
+		self.fuzzy_keys: list[str] = [default_process(key) for key in self.keys]  # Processed once instead of per suggestion
+
+	def __len__(self) -> int:
+		return len(self.keys)
+
+	def get(self, key: str) -> str | None:  # The value of exactly this key, ignoring case
+		key = key.lower()
+		i = bisect.bisect_left(self.keys, key)
+		return self.values[i] if i < len(self.keys) and self.keys[i] == key else None
+
+	def _prefix_matches(self, query: str):
+		i = bisect.bisect_left(self.keys, query)
+		while i < len(self.keys) and self.keys[i].startswith(query):
+			yield i
+			i += 1
+
+	def _substring_matches(self, query: str):
+		if len(query) <= GRAM_SIZE:
+			yield from self.grams.get(query, ())
+			return
+
+		postings = [self.grams.get(query[start : start + GRAM_SIZE], ()) for start in range(len(query) - GRAM_SIZE + 1)]
+		for i in min(postings, key=len):
+			if query in self.keys[i]:
+				yield i
+
+	def search(self, query: str, limit: int = 25) -> list[str]:
+		query = query.lower()
+		results: dict[str, None] = {}
+
+		for i in self._prefix_matches(query):
+			results[self.values[i]] = None
+			if len(results) >= limit:
+				return list(results)
+
+		for i in self._substring_matches(query) if query else ():
+			if not self.keys[i].startswith(query):
+				results[self.values[i]] = None
+				if len(results) >= limit:
+					break
+
+		return list(results)
+
+	def _suggest(self, query: str, limit: int) -> list[tuple[str, int]]:
+		query = default_process(query)
+		if not query:
+			return []
+
+		suggestions: dict[str, int] = {}
+		for _, score, i in process.extract(query, self.fuzzy_keys, scorer=fuzz.WRatio, processor=None, limit=None):
+			if self.values[i] not in suggestions:
+				suggestions[self.values[i]] = round(score)
+				if len(suggestions) >= limit:
+					break
+
+		return list(suggestions.items())
+
+	async def suggest(self, query: str, limit: int = 1) -> list[tuple[str, int]]:  # (value, confidence) pairs, best first
+		return await asyncio.get_running_loop().run_in_executor(None, self._suggest, query, limit)